@@ -110,7 +110,7 @@ class ComplexAttributes():
         kernel = (1,1,25)
         darray, chunks_init = self.create_array(darray, kernel, preview=preview)
         analytical_trace = darray.map_blocks(util.hilbert, dtype=darray.dtype)
-        result = da.absolute(analytical_trace)
+        result = analytical_trace.map_blocks(util.envelope, dtype=darray.dtype)
         result = util.trim_dask_array(result, kernel)
         
         return(result) 
@@ -152,7 +152,7 @@ class ComplexAttributes():
         """
         Description
         -----------
-        Compute the Cose of Instantaneous Phase of the input data
+        Compute the Cosine of Instantaneous Phase of the input data
         
         Parameters
         ----------
@@ -170,9 +170,12 @@ class ComplexAttributes():
         result : Dask Array
         """
         
-        darray, chunks_init = self.create_array(darray, preview=preview)            
-        phase = self.instantaneous_phase(darray)
-        result = da.rad2deg(da.angle(phase))
+        kernel = (1,1,25)
+        darray, chunks_init = self.create_array(darray, kernel, preview=preview)
+        analytical_trace = darray.map_blocks(util.hilbert, dtype=darray.dtype)
+        result = analytical_trace.map_blocks(util.cosine_phase, 
+                                             dtype=darray.dtype)
+        result = util.trim_dask_array(result, kernel)
         
         return(result)
             
@@ -358,9 +361,15 @@ class ComplexAttributes():
         result : Dask Array
         """
         
-        darray, chunks_init = self.create_array(darray, preview=preview)
+        # The chain reaches 2 samples across and 14 along the traces (the 
+        # Hilbert window and two derivatives). Its steps trim their own 
+        # ghosts, so the input is ghosted once by the combined kernel and 
+        # the result trimmed back to the input shape
+        kernel = (5,5,29)
+        darray, chunks_init = self.create_array(darray, kernel, preview=preview)
         inst_freq = self.instantaneous_frequency(darray, sample_rate)
         result = sp().first_derivative(inst_freq, axis=-1)
+        result = util.trim_dask_array(result, kernel)
                     
         return(result)
         
@@ -234,8 +234,8 @@ class EdgeDetection():
             for i in range(0, patches.shape[0]):
                 traces = patches[i]
                 traces = traces.reshape(-1, ki * kj * kk)
-                cov = np.apply_along_axis(cov, 1, traces, ki, kj, kk)
-                vals = np.linalg.eigvals(cov)
+                covs = np.apply_along_axis(cov, 1, traces, ki, kj, kk)
+                vals = np.linalg.eigvals(covs)
                 vals = np.abs(vals.max(axis=1) / vals.sum(axis=1))
             
                 out_data.append(vals)
@@ -247,8 +247,10 @@ class EdgeDetection():
         # Generate Dask Array as necessary and perform algorithm
         darray, chunks_init = self.create_array(darray, kernel, preview)        
         hilbert = darray.map_blocks(util.hilbert, dtype=darray.dtype)
-        result = hilbert.map_blocks(operation, kernel=kernel, dtype=darray.dtype)
-        result = util.trim_dask_array(result, kernel)
+        # The patches only cover the ghosted block where they fit whole, 
+        # which leaves exactly the block before ghosting, so no trim
+        result = hilbert.map_blocks(operation, kernel=kernel, dtype=darray.dtype, 
+                                    chunks=chunks_init)
         result[da.isnan(result)] = 0
         
         return(result)
@@ -15,6 +15,13 @@ from scipy import signal
 import util
 
 
+# Derivative operators as (weights along the derivative axis, smoothing 
+# weights along the other axes)
+FIRST_DERIVATIVE = ([-0.5, 0, 0.5], 
+                    [0.178947, 0.642105, 0.178947])
+SECOND_DERIVATIVE = ([0.232905, 0.002668, -0.471147, 0.002668, 0.232905], 
+                     [0.030320, 0.249724, 0.439911, 0.249724, 0.030320])
+
 
 class SignalProcess():
     """
@@ -107,15 +114,11 @@ class SignalProcess():
         """
         
         kernel = (3,3,3)
-        axes = [ax for ax in range(darray.ndim) if ax != axis]
+        weights, smooth = FIRST_DERIVATIVE
         darray, chunks_init = self.create_array(darray, kernel, preview=preview)        
-        result0 = darray.map_blocks(ndi.correlate1d, weights=[-0.5, 0, 0.5], 
-                                   axis=axis, dtype=darray.dtype)
-        result1 = result0.map_blocks(ndi.correlate1d, weights=[0.178947,0.642105,0.178947], 
-                                   axis=axes[0], dtype=darray.dtype)
-        result2 = result1.map_blocks(ndi.correlate1d, weights=[0.178947,0.642105,0.178947], 
-                                     axis=axes[1], dtype=darray.dtype)
-        result = util.trim_dask_array(result2, kernel)
+        result = darray.map_blocks(util.separable_correlate, weights=weights, 
+                                   smooth=smooth, axis=axis, dtype=darray.dtype)
+        result = util.trim_dask_array(result, kernel)
         
         return(result)
         
@@ -144,15 +147,11 @@ class SignalProcess():
         """
         
         kernel = (5,5,5)
-        axes = [ax for ax in range(darray.ndim) if ax != axis]
+        weights, smooth = SECOND_DERIVATIVE
         darray, chunks_init = self.create_array(darray, kernel, preview=preview)        
-        result0 = darray.map_blocks(ndi.correlate1d, weights=[0.232905, 0.002668, -0.471147, 0.002668, 0.232905], 
-                                    axis=axis, dtype=darray.dtype)
-        result1 = result0.map_blocks(ndi.correlate1d, weights=[0.030320, 0.249724, 0.439911, 0.249724, 0.030320], 
-                                   axis=axes[0], dtype=darray.dtype)
-        result2 = result1.map_blocks(ndi.correlate1d, weights=[0.030320, 0.249724, 0.439911, 0.249724, 0.030320], 
-                                   axis=axes[1], dtype=darray.dtype)
-        result = util.trim_dask_array(result2, kernel)
+        result = darray.map_blocks(util.separable_correlate, weights=weights, 
+                                   smooth=smooth, axis=axis, dtype=darray.dtype)
+        result = util.trim_dask_array(result, kernel)
         
         return(result)
         
@@ -286,14 +285,16 @@ class SignalProcess():
         
         # Function to extract patches and perform algorithm 
         def operation(chunk, kernel):
-            x = util.extract_patches(chunk, kernel)
-            out = np.sqrt(np.mean(x ** 2, axis=(-3, -2, -1)))
+            # Square before windowing so the mean streams over a view
+            x = util.extract_patches(chunk ** 2, kernel)
+            out = np.sqrt(np.mean(x, axis=(-3, -2, -1)))
 
             return(out)
         
+        # The windows only cover the ghosted block where they fit whole, 
+        # which leaves exactly the block before ghosting, so no trim
         darray, chunks_init = self.create_array(darray, kernel, preview=preview)
-        result = darray.map_blocks(operation, kernel=kernel, dtype=darray.dtype, chunks=darray.chunks)
-        result = util.trim_dask_array(result, kernel)
+        result = darray.map_blocks(operation, kernel=kernel, dtype=darray.dtype, chunks=chunks_init)
         result[da.isnan(result)] = 0 
         
         return(result)
@@ -388,8 +389,9 @@ class SignalProcess():
         
         # Function to extract patches and perform algorithm
         def operation(chunk, kernel):
-            x = util.extract_patches(chunk, (1, 1, kernel[-1]))
-            out = np.trapz(x).reshape(x.shape[:3])    
+            # Trapezoidal rule with unit spacing, reduced over the window view
+            x = util.extract_patches(chunk, (1, 1, kernel[-1]))[..., 0, 0, :]
+            out = x.sum(axis=-1) - 0.5 * (x[..., 0] + x[..., -1])
             
             return(out)
         
@@ -8,70 +8,112 @@ Utilities for reading seismic data from SEGY and converting to usable format.
 """
 
 # Import Libraries
-import dask.array as da
 import numpy as np
+import os
 import segyio
 import h5py
 from shutil import copyfile as cf
 
 
-def segy_read(segy_path, out_path, out_name):
+def _trace_lines(segy_file, segy_path):
+    """
+    Inline and crossline number of every trace, from header bytes 189 and 
+    193. Both fields are read in one strided pass over a memory map of the 
+    trace headers, instead of one pass of segyio per field. Files whose 
+    traces are not all the same length are read through segyio
+    """
+    data_bytes = os.path.getsize(segy_path) - 3600 - 3200 * segy_file.ext_headers
+    trace_bytes, extra = divmod(data_bytes, segy_file.tracecount)
+    
+    if extra or trace_bytes < 240:
+        return(segy_file.attributes(segyio.TraceField.INLINE_3D)[:],
+               segy_file.attributes(segyio.TraceField.CROSSLINE_3D)[:])
+    
+    header = np.dtype({'names': ['inline', 'xline'], 
+                       'formats': ['>i4', '>i4'], 
+                       'offsets': [188, 192], 
+                       'itemsize': trace_bytes})
+    headers = np.memmap(segy_path, dtype=header, mode='r', 
+                        offset=3600 + 3200 * segy_file.ext_headers, 
+                        shape=(segy_file.tracecount,))
     
-    def write(chunk, segy_file, dset):
-        for i in chunk:
-            dset[i[0], i[1], :] = segy_file.trace.raw[i[2]]
-            
-        return(chunk)
+    return(headers['inline'].astype(np.intc), headers['xline'].astype(np.intc))
+
+
+# Traces read from SEGY per bulk read in segy_read
+_TRACE_CHUNK = 10000
+
+
+def segy_read(segy_path, out_path, out_name):
     
-    segy_file = segyio.open(segy_path)
-    trace_inlines = segy_file.attributes(segyio.TraceField.INLINE_3D)[:]
-    trace_xlines = segy_file.attributes(segyio.TraceField.CROSSLINE_3D)[:]
+    # Geometry is rebuilt from the trace headers below, so segyio is not
+    # asked to infer it as well
+    with segyio.open(segy_path, ignore_geometry=True) as segy_file:
+        trace_inlines, trace_xlines = _trace_lines(segy_file, segy_path)
+        
+        # Without segyio's geometry check a repeated trace position would 
+        # reach the inline writes below as a duplicate fancy index
+        positions, counts = np.unique(np.stack((trace_inlines, trace_xlines), 
+                                               axis=1), 
+                                      axis=0, return_counts=True)
+        if (counts > 1).any():
+            inline, xline = positions[counts > 1][0]
+            raise ValueError('More than one trace at inline %d, crossline %d' 
+                             % (inline, xline))
     
-    trace_inlines_unique = np.unique(trace_inlines)
-    trace_xlines_unique = np.unique(trace_xlines)
+        trace_inlines_unique = np.unique(trace_inlines)
+        trace_xlines_unique = np.unique(trace_xlines)
     
-    num_inline = trace_inlines_unique.size
-    num_xline = trace_xlines_unique.size
-    num_zsamples = len(segy_file.samples)
+        num_inline = trace_inlines_unique.size
+        num_xline = trace_xlines_unique.size
+        num_zsamples = len(segy_file.samples)
     
-    min_inline = trace_inlines_unique.min()
-    min_xline = trace_xlines_unique.min()
-    min_zsample = segy_file.samples.min()
+        min_inline = trace_inlines_unique.min()
+        min_xline = trace_xlines_unique.min()
+        min_zsample = segy_file.samples.min()
     
-    max_inline = trace_inlines_unique.max()
-    max_xline = trace_xlines_unique.max()
-    max_zsample = segy_file.samples.max()
+        max_inline = trace_inlines_unique.max()
+        max_xline = trace_xlines_unique.max()
+        max_zsample = segy_file.samples.max()
     
-    inc_inline = int((max_inline - min_inline) / num_inline)
-    inc_xline = int((max_xline - min_xline) / num_xline)
-    inc_zsample = segy_file.bin[segyio.BinField.Interval] / 1000    
+        inc_inline = int((max_inline - min_inline) / num_inline)
+        inc_xline = int((max_xline - min_xline) / num_xline)
+        inc_zsample = segy_file.bin[segyio.BinField.Interval] / 1000    
     
-    shape = (trace_inlines_unique.size, trace_xlines_unique.size, num_zsamples)
-    ti_idx = trace_inlines - trace_inlines.min()
-    tx_idx = trace_xlines - trace_xlines.min()
-    idx = np.arange(ti_idx.size)
-    coords = np.dstack((ti_idx, tx_idx, idx))[0]
-    coords = da.from_array(coords, chunks=(25, 3))
+        shape = (trace_inlines_unique.size, trace_xlines_unique.size, num_zsamples)
+        ti_idx = trace_inlines - trace_inlines.min()
+        tx_idx = trace_xlines - trace_xlines.min()
     
-    with h5py.File(out_path, 'w') as f:
+        with h5py.File(out_path, 'w') as f:
         
-        dset = f.create_dataset(out_name, shape=shape)
+            dset = f.create_dataset(out_name, shape=shape)
         
-        dset.attrs['dims'] = shape
+            dset.attrs['dims'] = shape
         
-        dset.attrs['inc_inline'] = inc_inline
-        dset.attrs['inc_xline'] = inc_xline
-        dset.attrs['inc_zsample'] = inc_zsample
+            dset.attrs['inc_inline'] = inc_inline
+            dset.attrs['inc_xline'] = inc_xline
+            dset.attrs['inc_zsample'] = inc_zsample
         
-        dset.attrs['min_inline'] = min_inline
-        dset.attrs['min_xline'] = min_xline
-        dset.attrs['min_zsample'] = min_zsample
+            dset.attrs['min_inline'] = min_inline
+            dset.attrs['min_xline'] = min_xline
+            dset.attrs['min_zsample'] = min_zsample
         
-        dset.attrs['max_inline'] = max_inline
-        dset.attrs['max_xline'] = max_xline
-        dset.attrs['max_zsample'] = max_zsample
+            dset.attrs['max_inline'] = max_inline
+            dset.attrs['max_xline'] = max_xline
+            dset.attrs['max_zsample'] = max_zsample
                 
-        coords.map_blocks(write, segy_file, dset, dtype=np.float32).compute()
+            # Traces are read in bulk, _TRACE_CHUNK at a time, and each 
+            # chunk is written one inline at a time, not one trace at a time
+            for start in range(0, segy_file.tracecount, _TRACE_CHUNK):
+                stop = min(start + _TRACE_CHUNK, segy_file.tracecount)
+                traces = segy_file.trace.raw[start:stop]
+                
+                il, xl = ti_idx[start:stop], tx_idx[start:stop]
+                order = np.lexsort((xl, il))
+                lines, first = np.unique(il[order], return_index=True)
+                
+                for line, rows in zip(lines, np.split(order, first[1:])):
+                    dset[line, xl[rows], :] = traces[rows]
         
 
 
@@ -81,10 +123,6 @@ def segy_write(in_data, template_segy, out_file):
     
     with segyio.open(out_file, 'r+') as f:
         
-        for i in range(in_data.shape[0]):
-            try:
-                il = f.ilines[i]
-                f.iline[il] = in_data[i]
-                
-            except Exception:
-                continue
\ No newline at end of file
+        # Inlines past the end of the template are not written
+        for il, data in zip(f.ilines, in_data):
+            f.iline[il] = data
\ No newline at end of file
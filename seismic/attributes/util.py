@@ -8,15 +8,105 @@ Utilities for working with seismic and computing volume attributes.
 """
 
 # Import Libraries
+import os
+import contextlib
+import functools
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import dask.array as da
 import numpy as np
 import h5py
 import psutil
+from scipy import fft as sfft
+from scipy import ndimage as ndi
+
+# Optional FFTW backend for scipy.fft, used by hilbert when installed
+try:
+    import pyfftw
+    import pyfftw.interfaces.scipy_fft as fftw_backend
+except ImportError:
+    pyfftw = None
 
 # Ignore warning
 import warnings
 warnings.filterwarnings("ignore")
 
+# FFTW plans found for this machine can be kept between sessions with 
+# save_wisdom and load_wisdom, in the file named by this environment 
+# variable unless a path is given. Nothing is read or written on import
+WISDOM_ENV = 'SEISTOOL_FFTW_WISDOM'
+
+if pyfftw is not None:
+    pyfftw.interfaces.cache.enable()
+
+
+
+def _wisdom_path(file_path):
+    """
+    Wisdom file given, or else the one named by WISDOM_ENV
+    """
+    
+    file_path = file_path or os.environ.get(WISDOM_ENV)
+    if not file_path:
+        raise ValueError('No wisdom file given and {} is not set'.format(
+                         WISDOM_ENV))
+    
+    return(file_path)
+
+
+
+def load_wisdom(file_path=None):
+    """
+    Description
+    -----------
+    Load FFTW plans saved by save_wisdom, so hilbert skips planning the 
+    transform lengths already seen
+    
+    Keywork Arguments
+    -----------------  
+    file_path : str, path to wisdom file (Default is the file named by the 
+        SEISTOOL_FFTW_WISDOM environment variable)
+           
+    Returns
+    -------
+    loaded : bool, whether any wisdom was loaded. False without pyfftw or 
+        when the file does not exist
+    """
+    
+    if pyfftw is None:
+        return(False)
+    
+    try:
+        with open(_wisdom_path(file_path), 'rb') as f:
+            wisdom = f.read()
+    except FileNotFoundError:
+        return(False)
+    
+    # FFTW's own text format, one record per precision separated by NUL
+    return(any(pyfftw.import_wisdom(tuple(wisdom.split(b'\0')))))
+
+
+
+def save_wisdom(file_path=None):
+    """
+    Description
+    -----------
+    Save the FFTW plans of this session for load_wisdom
+    
+    Keywork Arguments
+    -----------------  
+    file_path : str, path to wisdom file (Default is the file named by the 
+        SEISTOOL_FFTW_WISDOM environment variable)
+    """
+    
+    if pyfftw is None:
+        return
+    
+    with open(_wisdom_path(file_path), 'wb') as f:
+        f.write(b'\0'.join(pyfftw.export_wisdom()))
+
+
+
 def compute_chunk_size(shape, byte_size, kernel=None, preview=None):
     """
     Description
@@ -51,17 +141,9 @@ def compute_chunk_size(shape, byte_size, kernel=None, preview=None):
         ki, kj, kk = kernel
         
     # Identify acceptable chunk sizes
-    i_s = np.arange(ki, shape[0])
-    j_s = np.arange(kj, shape[1])
-    k_s = np.arange(kk, shape[2])
-    
-    modi = shape[0] % i_s
-    modj = shape[1] % j_s
-    modk = shape[2] % k_s
-    
-    kki = i_s[(modi >= ki) | (modi == 0)]
-    kkj = j_s[(modj >= kj) | (modj == 0)]
-    kkk = k_s[(modk >= kk) | (modk == 0)]
+    kki = _valid_chunks(shape[0], ki)
+    kkj = _valid_chunks(shape[1], kj)
+    kkk = _valid_chunks(shape[2], kk)
     
     # Compute Machine Specific information
     mem = psutil.virtual_memory().available
@@ -90,8 +172,6 @@ def compute_chunk_size(shape, byte_size, kernel=None, preview=None):
             
             else:
                 j_s = np.arange(kkj, shape[1])
-                modj = shape[1] % j_s
-                kkj = j_s[(modj >= kj) | (modj == 0)]
                 Mj = j_s * kki * shape[2]
                 Mj = Mj[Mj < M]
                 chunks = [kki, Mj.argmax(), shape[2]]    
@@ -102,8 +182,6 @@ def compute_chunk_size(shape, byte_size, kernel=None, preview=None):
                 
             else:
                 i_s = np.arange(kki, shape[0])
-                modi = shape[0] % i_s
-                kki = i_s[(modi >= ki) | (modi == 0)]
                 Mi = i_s * kkj * shape[2]
                 Mi = Mi[Mi < M]
                 chunks = [Mi.argmax(), kkj, shape[2]]                    
@@ -114,14 +192,30 @@ def compute_chunk_size(shape, byte_size, kernel=None, preview=None):
             
             else:
                 j_s = np.arange(kkj, shape[1])
-                modj = shape[1] % j_s
-                kkj = j_s[(modj >= kj) | (modj == 0)]
                 Mj = j_s * kkk * shape[0]
                 Mj = Mj[Mj < M]
                 chunks = [shape[0], Mj.argmax(), kkk]
         
     return(tuple(chunks))
     
+    
+
+
+def _valid_chunks(N, k):
+    """
+    Chunk sizes along an axis of length N that either divide it evenly or 
+    leave a remainder of at least the kernel size k. The modulo sweep runs 
+    in int32, the sizes are returned as int64 since callers multiply them 
+    into chunk volumes that overflow int32.
+    """
+    
+    sizes = np.arange(k, N, dtype=np.int32)
+    mod = np.empty_like(sizes)
+    np.mod(N, sizes, out=mod)
+    
+    # Positions of the valid sizes, offset by the first candidate k
+    return(np.flatnonzero((mod == 0) | (mod >= k)) + k)
+        
         
         
 def trim_dask_array(in_data, kernel):
@@ -144,7 +238,10 @@ def trim_dask_array(in_data, kernel):
     hw = tuple(np.array(kernel) // 2)    
     axes = {0 : hw[0], 1 : hw[1], 2: hw[2]}
     
-    return(da.overlap.trim_internal(in_data, axes=axes))
+    # The arrays are ghosted with reflected boundaries (create_array), so 
+    # the outer ghost zones are trimmed as well. Dask's default boundary 
+    # 'none' would leave them on the result
+    return(da.overlap.trim_internal(in_data, axes=axes, boundary='reflect'))
     
     
 
@@ -163,12 +260,25 @@ def available_volumes(file_path):
     vols : list, array of volume names in file
     """
     
-    # Iterate through HDF5 file and output dataset names
-    with h5py.File(file_path) as f:
-        vols = [i for i in f]
+    # Names are cached per file modification time
+    vols = list(_volume_names(file_path, os.path.getmtime(file_path)))
     
     return(vols)
     
+    
+
+@functools.lru_cache(maxsize=64)
+def _volume_names(file_path, mtime):
+    """
+    Read dataset names from an HDF5 file opened read-only. The mtime 
+    argument only serves as part of the cache key.
+    """
+    
+    with h5py.File(file_path, 'r') as f:
+        names = tuple(f.keys())
+    
+    return(names)
+    
 
 
 def read(file_path):
@@ -183,10 +293,11 @@ def read(file_path):
        
     Returns
     -------
-    data : HDF5 dataset, pointer to data on disk
+    data : HDF5 dataset, pointer to data on disk. The file is open read-only
+        for as long as the dataset is referenced, or until data.file.close()
     """
     
-    data = h5py.File(file_path)['data']
+    data = h5py.File(file_path, 'r')['data']
     
     return(data)
     
@@ -205,14 +316,110 @@ def save(out_data, out_file):
     """
     
     # Save to disk if object is Dask Array
-    try:       
-        out_data.to_hdf5(out_file, 'data')
-    except Exception:
+    if not isinstance(out_data, da.Array):
         raise Exception('Object is not a Dask Array')
+    
+    # Dask blocks are aligned to whole HDF5 chunks so every block owns its 
+    # chunks and the compressed writes can proceed without a lock
+    out_data, chunks = _hdf5_layout(out_data)
+    with h5py.File(out_file, 'w') as f:
+        dset = _create_dataset(f, out_data, chunks)
+        da.store(out_data, dset, lock=False)
         
         
 
-def convert_dtype(in_data, min_val, max_val, to_dtype):
+def save_pipelined(out_data, out_file, prefetch=4):
+    """
+    Description
+    -----------
+    Save a Dask Array to disk block by block, computing up to prefetch 
+    blocks ahead while earlier blocks are being written
+    
+    Parameters
+    ----------
+    out_data : Dask Array, data to be saved to disk
+    out_file : str, path to file to save to
+    
+    Keywork Arguments
+    -----------------    
+    prefetch : int, number of blocks computed concurrently with the writer
+    """
+    
+    if not isinstance(out_data, da.Array):
+        raise Exception('Object is not a Dask Array')
+    
+    out_data, chunks = _hdf5_layout(out_data)
+    blocks = out_data.to_delayed().ravel()
+    regions = da.core.slices_from_chunks(out_data.chunks)
+    
+    with h5py.File(out_file, 'w') as f:
+        dset = _create_dataset(f, out_data, chunks)
+        
+        # Workers compute blocks, the calling thread is the only writer
+        with ThreadPoolExecutor(max_workers=prefetch) as pool:
+            pending = collections.deque()
+            for block, region in zip(blocks, regions):
+                future = pool.submit(block.compute, scheduler='sync')
+                pending.append((future, region))
+                
+                if len(pending) >= prefetch:
+                    future, region = pending.popleft()
+                    dset[region] = future.result()
+            
+            while pending:
+                future, region = pending.popleft()
+                dset[region] = future.result()
+        
+        
+        
+_HDF5_CHUNK_BYTES = 4 * 2**20
+
+
+
+def _hdf5_layout(out_data):
+    """
+    Pick line-shaped HDF5 chunks of at most _HDF5_CHUNK_BYTES for out_data 
+    and rechunk it so every Dask block covers whole HDF5 chunks. Small 
+    chunks keep single-line reads cheap; whole-chunk blocks keep the 
+    lock-free writes safe.
+    """
+    
+    blocks = out_data.chunksize
+    itemsize = out_data.dtype.itemsize
+    
+    # One line deep, the last axis kept whole where it fits in the budget
+    chunks = [1] * out_data.ndim
+    budget = max(1, _HDF5_CHUNK_BYTES // itemsize)
+    for axis in reversed(range(min(1, out_data.ndim - 1), out_data.ndim)):
+        chunks[axis] = max(1, min(blocks[axis], budget))
+        budget = max(1, budget // chunks[axis])
+    chunks = tuple(min(c, b) for c, b in zip(chunks, blocks))
+    
+    # Round each block down to a whole number of HDF5 chunks
+    aligned = tuple((b // c) * c for b, c in zip(blocks, chunks))
+    if aligned != blocks or any(len(set(c[:-1])) > 1 for c in out_data.chunks):
+        out_data = out_data.rechunk(aligned)
+    
+    return(out_data, chunks)
+
+
+
+def _create_dataset(f, out_data, chunks):
+    """
+    Create the 'data' dataset for out_data with the given HDF5 chunks, 
+    byte-shuffled and LZF compressed.
+    """
+    
+    dset = f.create_dataset('data', shape=out_data.shape, 
+                            dtype=out_data.dtype, 
+                            chunks=chunks, 
+                            compression='lzf', shuffle=True)
+    
+    return(dset)
+        
+        
+
+def convert_dtype(in_data, min_val, max_val, to_dtype, clip=True):
     """
     Description
     -----------
@@ -225,6 +432,11 @@ def convert_dtype(in_data, min_val, max_val, to_dtype):
     max_val : number, upper clip
     to_dtype : NumPy dtype
         Acceptable formats include (np.int8, np.float16, np.float32)
+    
+    Keywork Arguments
+    -----------------    
+    clip : bool, clip data to (min_val, max_val). Disable when the data is 
+        already known to lie within that range to save a pass over it
        
     Returns
     -------
@@ -238,18 +450,24 @@ def convert_dtype(in_data, min_val, max_val, to_dtype):
     
     else:              
         
-        in_data = da.clip(in_data, min_val, max_val)        
         if to_dtype == np.int8:
             in_data = ((in_data - min_val) / (max_val - min_val))
             dtype = np.iinfo(np.int8)
             in_data *= dtype.max - dtype.min
-            in_data -= dtype.min
+            in_data += dtype.min
+            # Clipping after the affine map bounds the data in one pass
+            if clip:
+                in_data = da.clip(in_data, dtype.min, dtype.max)
             out = in_data.astype(np.int8)
         
         elif to_dtype == np.float16:
+            if clip:
+                in_data = da.clip(in_data, min_val, max_val)
             out = in_data.astype(np.float16)
             
         elif to_dtype == np.int32:
+            if clip:
+                in_data = da.clip(in_data, min_val, max_val)
             out = in_data.astype(np.float32)
             
         else:
@@ -267,22 +485,26 @@ def extract_patches(in_data, kernel):
     
     Parameters
     ----------
-    in_data : Dask Array, data to convert
+    in_data : Numpy Array or Dask Array, data to convert
     kernel : tuple (len 3), operator size
        
     Returns
     -------
-    out : Numpy Array, has shape (in_data.shape[0], in_data.shape[1], 
-                                  in_data.shape[2], kernel[0], kernel[1], kernel[2])
+    out : Numpy Array or Dask Array (matching in_data), read-only view with 
+          shape (in_data.shape[0] - kernel[0] + 1, 
+                 in_data.shape[1] - kernel[1] + 1, 
+                 in_data.shape[2] - kernel[2] + 1, 
+                 kernel[0], kernel[1], kernel[2])
     """
     
-    strides = in_data.strides + in_data.strides
-    shape = (np.array(in_data.shape) - np.array(kernel)) + 1
-    shape = tuple(list(shape) + list(kernel))
-    
-    patches = np.lib.stride_tricks.as_strided(in_data,
-                                              shape=shape,
-                                              strides=strides)        
+    # Windowed views never copy the underlying data
+    if isinstance(in_data, np.ndarray):
+        patches = np.lib.stride_tricks.sliding_window_view(in_data, kernel)
+    elif isinstance(in_data, da.Array):
+        patches = da.lib.stride_tricks.sliding_window_view(in_data, kernel)
+    else:
+        raise TypeError('Object is not a Numpy or Dask Array')
+        
     return(patches)
     
     
@@ -296,7 +518,8 @@ def local_events(in_data, comparator):
     Parameters
     ----------
     in_data : Dask Array, data to convert
-    comparator : function, defines truth between neighboring elements
+    comparator : NumPy ufunc, defines truth between neighboring elements 
+        (e.g. np.greater, np.less)
        
     Returns
     -------
@@ -308,16 +531,51 @@ def local_events(in_data, comparator):
     plus = in_data.take(idx + 1, axis=-1, mode='clip')
     minus = in_data.take(idx - 1, axis=-1, mode='clip')
     
-    result = np.ones(in_data.shape, dtype=np.bool)
+    result = np.empty(in_data.shape, dtype=np.bool_)
+    other = np.empty(in_data.shape, dtype=np.bool_)
     
-    result &= comparator(trace, plus)
-    result &= comparator(trace, minus)
+    comparator(trace, plus, out=result)
+    comparator(trace, minus, out=other)
+    np.logical_and(result, other, out=result)
     
     return(result)
     
     
     
-def hilbert(in_data):
+def separable_correlate(in_data, weights, smooth, axis=-1):
+    """
+    Description
+    -----------
+    Correlate in_data with weights along axis, then with smooth along each 
+    remaining axis in turn (reflected boundaries)
+    
+    Parameters
+    ----------
+    in_data : Numpy Array, data to filter
+    weights : array-like, 1D operator applied along axis
+    smooth : array-like, 1D operator applied along the other axes
+    
+    Keywork Arguments
+    -----------------  
+    axis : Number, axis dimension
+    
+    Returns
+    -------
+    out : Numpy Array
+    """
+    
+    axis = axis % in_data.ndim
+    out = ndi.correlate1d(in_data, weights, axis=axis)
+    
+    for ax in range(in_data.ndim):
+        if ax != axis:
+            out = ndi.correlate1d(out, smooth, axis=ax)
+    
+    return(out)
+    
+    
+    
+def hilbert(in_data, fast=False):
     """
     Description
     -----------
@@ -326,6 +584,13 @@ def hilbert(in_data):
     Parameters
     ----------
     in_data : Dask Array, data to convert
+    
+    Keywork Arguments
+    -----------------  
+    fast : bool, zero-pad traces to a 5-smooth length, which avoids the slow
+        FFT paths taken for lengths with large prime factors. The padding 
+        changes the analytic trace, mostly near the ends of the traces, so 
+        it is off by default and the result matches scipy.signal.hilbert
            
     Returns
     -------
@@ -333,10 +598,96 @@ def hilbert(in_data):
     """
     
     N = in_data.shape[-1]
+    n_fast = sfft.next_fast_len(N) if fast else N
     
-    Xf = np.fft.fft(in_data, n=N, axis=-1)
+    with _fft_backend():
+        Xf = sfft.fft(in_data, n=n_fast, axis=-1, workers=-1)
+        
+        # The spectrum is a private buffer, so mask and inverse it in place.
+        # scipy.fft (and pyfftw) cache plans per transform length
+        Xf *= _hilbert_mask(n_fast, in_data.ndim, Xf.dtype)
+        x = sfft.ifft(Xf, axis=-1, overwrite_x=True, workers=-1)
+    return x[..., :N]
+
+
+
+def _fft_backend():
+    """
+    Context routing scipy.fft calls to pyfftw when it is installed
+    """
+    
+    if pyfftw is None:
+        return(contextlib.nullcontext())
+    
+    return(sfft.set_backend(fftw_backend))
+
+
+
+def envelope(in_data):
+    """
+    Description
+    -----------
+    Magnitude of an analytic trace as sqrt(re**2 + im**2), accumulated in
+    a single output buffer
+    
+    Parameters
+    ----------
+    in_data : Numpy Array, complex analytic trace
+           
+    Returns
+    -------
+    out : Numpy Array
+    """
+    
+    re = in_data.real
+    im = in_data.imag
+    
+    # Plain multiply-adds vectorize better than the overflow-safe hypot
+    out = np.multiply(re, re)
+    out += im * im
+    np.sqrt(out, out=out)
+    
+    return(out)
+
+
+
+def cosine_phase(in_data):
+    """
+    Description
+    -----------
+    Cosine of the phase of an analytic trace, computed as real part over 
+    magnitude so no angle is ever formed
+    
+    Parameters
+    ----------
+    in_data : Numpy Array, complex analytic trace
+           
+    Returns
+    -------
+    out : Numpy Array
+    """
+    
+    re = in_data.real
+    out = envelope(in_data)
+    
+    # Zero amplitude has zero phase
+    zero = out == 0
+    np.divide(re, out, out=out, where=~zero)
+    out[zero] = 1
+    
+    return(out)
+
+
+
+@functools.lru_cache(maxsize=16)
+def _hilbert_mask(N, ndim, dtype):
+    """
+    Frequency-domain mask of length N for the analytic signal, shaped to 
+    broadcast along the last axis of an ndim array. Cached arrays are 
+    shared between calls and therefore read-only.
+    """
     
-    h = np.zeros(N)
+    h = np.zeros(N, dtype=dtype)
     if N % 2 == 0:
         h[0] = h[N // 2] = 1
         h[1:N // 2] = 2
@@ -344,9 +695,6 @@ def hilbert(in_data):
         h[0] = 1
         h[1:(N + 1) // 2] = 2
 
-    if in_data.ndim > 1:
-        ind = [np.newaxis] * in_data.ndim
-        ind[-1] = slice(None)
-        h = h[ind]
-    x = np.fft.ifft(Xf * h, axis=-1)
-    return x
+    h = h.reshape((1,) * (ndim - 1) + (N,))
+    h.flags.writeable = False
+    return h
@@ -1,3 +1,22 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import matplotlib.pyplot as plt
+from scipy.ndimage import uniform_filter1d
+
+def _line_index(a_line, loc):
+  """
+  Index of loc in a sorted array of inline, crossline, or timeslice locations 
+  (binary search instead of a full np.where scan)
+  """
+
+  id = int(np.searchsorted(a_line, loc))
+  if id == len(a_line) or a_line[id] != loc:
+    raise ValueError("{} is not on the line/sample grid".format(loc))
+  
+  return(id)
+
 def slice_cube(cube, type='il', 
                inline_loc=400, inline_array=None,
                xline_loc=None, xline_array=None,
@@ -44,11 +63,8 @@ def slice_cube(cube, type='il',
 
   """
 
-  import numpy as np
-  import matplotlib.pyplot as plt
-
   if type == 'il':
-    id = np.where(inline_array == inline_loc)[0][0]
+    id = _line_index(inline_array, inline_loc)
     inline_slice = cube[id,:,:]
     
     if display == 'No':
@@ -67,7 +83,7 @@ def slice_cube(cube, type='il',
 
   if type == 'xl':
 
-    id = np.where(xline_array == xline_loc)[0][0]
+    id = _line_index(xline_array, xline_loc)
     xline_slice = cube[:,id,:]
 
     if display == 'No':
@@ -86,7 +102,7 @@ def slice_cube(cube, type='il',
   
   if type == 'ts':
 
-    id = np.where(timeslice_array == timeslice_loc)[0][0]
+    id = _line_index(timeslice_array, timeslice_loc)
     tslice = cube[:,:,id]
 
     if display == 'No':
@@ -107,6 +123,42 @@ def slice_cube(cube, type='il',
       plt.axis('equal')
       plt.show()  
 
+def _mean_trace(cube):
+  """
+  Average trace of a 3D cube, reduced over blocks of inlines in parallel 
+  (NumPy releases the GIL while summing) and accumulated in float64
+  """
+
+  n_blocks = min(os.cpu_count() or 1, len(cube))
+  blocks = np.array_split(np.arange(len(cube)), n_blocks)
+
+  def block_sum(rows):
+    return np.sum(cube[rows[0]:rows[-1] + 1], axis=(0, 1), dtype=np.float64)
+
+  with ThreadPoolExecutor(n_blocks) as pool:
+    total = sum(pool.map(block_sum, blocks))
+
+  return(total / (cube.shape[0] * cube.shape[1]))
+
+def _spectrum(trace, sample_rate):
+  """
+  One-sided frequency spectrum of a trace, smoothed over a window of 10
+  """
+
+  n_seis = len(trace)
+
+  # real-input FFT: half the work of a full FFT, and only the positive 
+  # frequencies are kept (n_seis//2 of them, as before)
+  freq_seis = np.arange(n_seis//2) * (1 / (n_seis * sample_rate))
+  spec_seis = np.fft.rfft(trace)[:n_seis//2] / n_seis  # FFT computing and normalization.
+
+  # This is to smooth the spectrum over a window of 10. A running sum, the
+  # same window and zero padding as np.convolve(..., mode='same')
+  spec_seis = uniform_filter1d(spec_seis.real, size=10, mode='constant') + \
+              1j * uniform_filter1d(spec_seis.imag, size=10, mode='constant')
+
+  return(freq_seis, spec_seis)
+
 def frequency_spectrum(data, type='il', inline_array=None, xline_array=None, timeslice_array=None, sample_rate=0.004):
 
   """
@@ -132,15 +184,10 @@ def frequency_spectrum(data, type='il', inline_array=None, xline_array=None, tim
   
   """
 
-  import numpy as np
-  import matplotlib.pyplot as plt
-
   if type == 'il':
 
-    # transpose the slice 
-    transp_slice = np.transpose(data)
-
-    # take the average of each individual line traces
+    # take the average of each individual line traces, reducing over the 
+    # traces of the (traces, time) slice as stored
 
     # time
     min_time = 0
@@ -150,28 +197,14 @@ def frequency_spectrum(data, type='il', inline_array=None, xline_array=None, tim
     xmin = 0
     xmax = len(xline_array)
 
-    trace = np.mean(transp_slice[min_time:max_time, xmin:xmax], axis=1)
+    trace = np.mean(data[xmin:xmax, min_time:max_time], axis=0)
 
-    Fs_seis = 1 / sample_rate  # Seconds.
-    n_seis = len(trace)
-    k_seis = np.arange(n_seis)
-    T_seis = n_seis / Fs_seis
-    freq_seis = k_seis / T_seis
-    freq_seis = freq_seis[range(n_seis//2)]  # One side frequency range.
-
-    spec_seis = np.fft.fft(trace) / n_seis  # FFT computing and normalization.
-    spec_seis = spec_seis[range(n_seis//2)]
-
-    # This is to smooth the spectrum over a window of 10.
-    roll_win = np.ones(10) / 10
-    spec_seis = np.convolve(spec_seis, roll_win, mode='same')
+    freq_seis, spec_seis = _spectrum(trace, sample_rate)
 
   if type == 'xl':
 
-    # transpose the slice 
-    transp_slice = np.transpose(data)
-
-    # take the average of each individual line traces
+    # take the average of each individual line traces, reducing over the 
+    # traces of the (traces, time) slice as stored
 
     # time
     min_time = 0
@@ -181,27 +214,12 @@ def frequency_spectrum(data, type='il', inline_array=None, xline_array=None, tim
     xmin = 0
     xmax = len(inline_array)
 
-    trace = np.mean(transp_slice[min_time:max_time, xmin:xmax], axis=1)
+    trace = np.mean(data[xmin:xmax, min_time:max_time], axis=0)
 
-    Fs_seis = 1 / sample_rate  # Seconds.
-    n_seis = len(trace)
-    k_seis = np.arange(n_seis)
-    T_seis = n_seis / Fs_seis
-    freq_seis = k_seis / T_seis
-    freq_seis = freq_seis[range(n_seis//2)]  # One side frequency range.
-
-    spec_seis = np.fft.fft(trace) / n_seis  # FFT computing and normalization.
-    spec_seis = spec_seis[range(n_seis//2)]
-
-    # This is to smooth the spectrum over a window of 10.
-    roll_win = np.ones(10) / 10
-    spec_seis = np.convolve(spec_seis, roll_win, mode='same')
+    freq_seis, spec_seis = _spectrum(trace, sample_rate)
   
   if type == 'whole':
 
-    # transpose the cube
-    transp_cube = np.transpose(data)
-
     # time
     min_time = 0
     max_time = len(timeslice_array)
@@ -214,31 +232,12 @@ def frequency_spectrum(data, type='il', inline_array=None, xline_array=None, tim
     ymin = 0
     ymax = len(inline_array)
 
-    mean_xl_traces = [] # mean of crossline traces of each inline section
-
-    for i in range(ymax):
-      mean_xl = np.mean(transp_cube[min_time:max_time, xmin:xmax, i], axis=1)
-      mean_xl_traces.append(mean_xl)
-
-    transp_xl = np.transpose(mean_xl_traces)
-
-    # take average of each individual mean values of xl in the inline section
-
-    trace = np.mean(transp_xl[min_time:max_time, ymin:ymax], axis=1)
-
-    Fs_seis = 1 / sample_rate  # Seconds.
-    n_seis = len(trace)
-    k_seis = np.arange(n_seis)
-    T_seis = n_seis / Fs_seis
-    freq_seis = k_seis / T_seis
-    freq_seis = freq_seis[range(n_seis//2)]  # One side frequency range.
-
-    spec_seis = np.fft.fft(trace) / n_seis  # FFT computing and normalization.
-    spec_seis = spec_seis[range(n_seis//2)]
+    # average trace over all inlines and crosslines (every inline has the 
+    # same number of crosslines, so this equals the mean of the per-inline 
+    # mean traces)
+    trace = _mean_trace(data[ymin:ymax, xmin:xmax, min_time:max_time])
 
-    # This is to smooth the spectrum over a window of 10.
-    roll_win = np.ones(10) / 10
-    spec_seis = np.convolve(spec_seis, roll_win, mode='same')
+    freq_seis, spec_seis = _spectrum(trace, sample_rate)
 
   return(freq_seis, spec_seis)      
       
@@ -257,18 +256,15 @@ def slicing(cube, type, loc, a_line):
           type you're choosing (1D numpy array)
   """
 
-  import numpy as np
+  id = _line_index(a_line, loc)
 
   if type == 'il':
-    id = np.where(a_line == loc)[0][0]
     slices = cube[id,:,:]
   
   if type == 'xl':
-    id = np.where(a_line == loc)[0][0]
     slices = cube[:,id,:]
   
   if type == 'ts':
-    id = np.where(a_line == loc)[0][0]
     slices = cube[:,:,id]
   
   return(slices)
@@ -297,20 +293,12 @@ def display_slice(slices, type, b_line, c_line, cmap, vmin, vmax):
 
   """
 
-  import numpy as np
-  import matplotlib.pyplot as plt
+  # every type of slice is drawn the same way; type only selects b_line, c_line
+  extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
+  p1 = plt.imshow(slices.T, vmin=vmin, vmax=vmax, aspect='auto', extent=extent, cmap=cmap)
+  plt.colorbar(p1)
 
-  if type == 'il' or type == 'xl':
-    extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
-    p1 = plt.imshow(slices.T, vmin=vmin, vmax=vmax, aspect='auto', extent=extent, cmap=cmap)
-    plt.colorbar(p1)
-   
-  if type == 'ts':
-    extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
-    p1 = plt.imshow(slices.T, vmin=vmin, vmax=vmax, aspect='auto', extent=extent, cmap=cmap)
-    plt.colorbar(p1)
-
-def attribute_input(slices, type):
+def attribute_input(slices, type, dtype=np.float32):
   """
   Preparing the input array for attribute processing, after that passed to d2geo
 
@@ -319,22 +307,24 @@ def attribute_input(slices, type):
   slices: inline, crossline, or time slices output of function `slicing`
           (2D numpy array)
   type: 'il' for inline, 'xl' for crossline, 'ts' for timeslice
+  dtype: data type of the attribute input (Default is float32, which holds 
+         the 16-24 significant bits of seismic amplitudes and halves the 
+         memory traffic of float64; None keeps the dtype of slices)
 
   Output:
 
   darray: 3D numpy array, that will be passed to d2geo attributes 
   """
 
-  import numpy as np
-
-  if type == 'il':
-    darray = np.reshape(slices, slices.shape + (1,))
-  
-  if type == 'xl':
-    darray = np.reshape(slices, slices.shape + (1,))    
+  if type == 'il' or type == 'xl':
+    darray = slices[..., np.newaxis]
   
   if type == 'ts':
-    darray = np.reshape(np.transpose(slices), (np.transpose(slices)).shape + (1,))
+    # transpose is a stride-swapped view; create_array copies it only once
+    darray = slices.T[..., np.newaxis]
+  
+  # only copies when the dtype changes
+  darray = np.asarray(darray, dtype=dtype)
   
   return(darray)
 
@@ -365,21 +355,15 @@ def display_attribute(computed_attribute, type, b_line, c_line, cmap, vmin, vmax
   attribute_slice: 2D Numpy array
   """
 
-  import numpy as np
-  import matplotlib.pyplot as plt
+  # Drop the synthetic last axis of attribute_input; the Dask array is 
+  # computed once here instead of through a transposed graph
+  attribute_slice = np.asarray(computed_attribute)[..., 0]
 
   if type == 'il' or type == 'xl':
-    trans_attr = computed_attribute.T
-    reshape = trans_attr.reshape((trans_attr.shape[0], -1))
-
-    extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
-    p1 = plt.imshow(reshape.T, vmin=vmin, vmax=vmax, aspect='auto', extent=extent, cmap=cmap)
-    plt.colorbar(p1)
-
-  if type == 'ts':
-    trans_attr = computed_attribute.T
-    reshape = trans_attr.reshape((trans_attr.shape[0], -1))
+    # traces along the columns, time down the rows
+    attribute_slice = attribute_slice.T
 
-    extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
-    p1 = plt.imshow(reshape, vmin=vmin, vmax=vmax, aspect='auto', extent=extent, cmap=cmap)
-    plt.colorbar(p1)    
+  extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
+  p1 = plt.imshow(attribute_slice, vmin=vmin, vmax=vmax, aspect='auto', extent=extent, cmap=cmap, 
+                  interpolation='nearest', resample=False)
+  plt.colorbar(p1)
@@ -1,49 +1,372 @@
-def openSegy3D(filename):
+import atexit
+import importlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import IntEnum
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.ticker import FuncFormatter
+from scipy import ndimage
+
+# Optional GPU resampling for sliceViewer, looked up once at import
+try:
+  import cupy as cp
+  from cupyx.scipy import ndimage as cp_ndimage
+except ImportError:
+  cp = None
+
+# Open SEGY handles by (path, modification time), most recently used last.
+# Reopening a file skips segyio's scan of the trace headers for geometry
+_SEGY_FILES = OrderedDict()
+_SEGY_FILES_SIZE = 4
+
+def _open_segy(filename):
   """
-  Open 3D seismic volume in SEGY or SGY format 
+  Open a SEGY file through the handle cache. A handle is closed when it is 
+  evicted, at exit, or when the file changed on disk
   """
   import segyio
 
-  try:
-    with segyio.open(filename) as f:
+  path = os.path.abspath(filename)
+  key = (path, os.path.getmtime(path))
+
+  if key in _SEGY_FILES:
+    _SEGY_FILES.move_to_end(key)
+    return _SEGY_FILES[key]
+
+  f = segyio.open(path)
+  for old in [k for k in _SEGY_FILES if k[0] == path]:
+    _SEGY_FILES.pop(old).close()
+  _SEGY_FILES[key] = f
+  if len(_SEGY_FILES) > _SEGY_FILES_SIZE:
+    _SEGY_FILES.popitem(last=False)[1].close()
+
+  return f
+
+@atexit.register
+def _close_segy_files():
+  while _SEGY_FILES:
+    _SEGY_FILES.popitem()[1].close()
+
+def _ibm_to_float32(words):
+  """
+  IBM System/360 single precision floats, given as their 32-bit words, to 
+  IEEE float32: sign bit, base-16 exponent biased by 64, 24-bit fraction
+  """
+  words = np.asarray(words, dtype=np.uint32)
+  exponent = ((words >> 24) & 0x7f).astype(np.int32)
+  value = np.ldexp((words & 0xffffff).astype(np.float32), 4 * exponent - 280)
+  value[words >> 31 == 1] *= -1
+  return value
+
+class _IBMCube:
+  """
+  Memory map of a cube of IBM float samples. Indexing reads and converts 
+  only the samples indexed, so an IBM file is opened as lazily as an IEEE 
+  one
+  """
+  def __init__(self, words):
+    self.words = words
+    self.shape, self.dtype, self.ndim = words.shape, np.dtype(np.float32), 3
+
+  def __len__(self):
+    return self.shape[0]
+
+  def __getitem__(self, key):
+    return _ibm_to_float32(self.words[key])
 
-      data = segyio.tools.cube(f)
+  def __array__(self, dtype=None):
+    return np.asarray(_ibm_to_float32(self.words), dtype=dtype)
 
-      inlines = f.ilines
-      crosslines = f.xlines
-      twt = f.samples
-      sample_rate = segyio.tools.dt(f) / 1000
+def _memmap_cube(f, filename):
+  """
+  Samples of an open SEGY file as a read-only memory map, shaped like 
+  segyio.tools.cube. Only the pages of the slices used are read from disk.
+  IEEE floats are mapped as they are, IBM floats through _IBMCube.
+  None if the layout cannot be mapped (other sample formats, prestack or 
+  unsorted traces, variable trace length), for those the cube must be 
+  read whole
+  """
+  import segyio
+
+  formats = {segyio.SegySampleFormat.IEEE_FLOAT_4_BYTE: '>f4',
+             segyio.SegySampleFormat.IBM_FLOAT_4_BYTE: '>u4'}
+  if f.unstructured or len(f.offsets) > 1 or f.format not in formats:
+    return None
+
+  n_samples = len(f.samples)
+  if f.sorting == segyio.TraceSortingFormat.INLINE_SORTING:
+    shape = (len(f.ilines), len(f.xlines), n_samples)
+  else:
+    shape = (len(f.xlines), len(f.ilines), n_samples)
+
+  # 3600 bytes of textual and binary header, 3200 per extended header,
+  # then every trace is a 240 byte header followed by its samples
+  offset = 3600 + 3200 * f.ext_headers
+  trace = np.dtype([('header', 'V240'), 
+                    ('samples', formats[f.format], (n_samples,))])
+  if os.path.getsize(filename) != offset + trace.itemsize * f.tracecount:
+    return None
+
+  traces = np.memmap(filename, dtype=trace, mode='r', offset=offset, 
+                     shape=(f.tracecount,))
+  samples = traces['samples'].reshape(shape)
+  if f.format == segyio.SegySampleFormat.IBM_FLOAT_4_BYTE:
+    return _IBMCube(samples)
+  return samples
+
+def _hdf5_path(filename):
+  return os.path.splitext(filename)[0] + '.h5'
+
+class _TransposedCube:
+  """
+  Cube stored three times in HDF5, with inlines, crosslines and time as the
+  leading axis. A single inline, crossline or timeslice is read from the 
+  copy where it is contiguous; any other indexing reads the inline copy.
+  The HDF5 file stays open until close() is called, the cube is used as a 
+  context manager, or it is garbage collected
+  """
+  def __init__(self, h5):
+    self.ilines, self.xlines, self.depth = h5['ilines'], h5['xlines'], h5['depth']
+    self.shape, self.dtype, self.ndim = self.ilines.shape, self.ilines.dtype, 3
+    self._close = weakref.finalize(self, h5.close)
+
+  def close(self):
+    self._close()
 
-      print('Successfully read \n')
-      print('Inline range from', inlines[0], 'to', inlines[-1])
-      print('Crossline range from', crosslines[0], 'to', crosslines[-1])
-      print('TWT from', twt[0], 'to', twt[-1])   
-      print('Sample rate:', sample_rate, 'ms')  
+  def __enter__(self):
+    return self
 
-      try:
-        rot, cdpx, cdpy = segyio.tools.rotation(f, line="fast")
-        print('Survey rotation: {:.2f} deg'.format(rot))      
-      except:
-        print("Survey rotation not recognized")  
+  def __exit__(self, *exc):
+    self.close()
+
+  def __len__(self):
+    return self.shape[0]
+
+  def __getitem__(self, key):
+    key = key if isinstance(key, tuple) else (key,)
+    il, xl, t = key + (slice(None),) * (3 - len(key))
+    index = lambda k: isinstance(k, (int, np.integer))
+
+    if index(il):
+      return self.ilines[il, xl, t]
+    if index(xl):
+      return self.xlines[xl, il, t]
+    if index(t):
+      return self.depth[t, il, xl]
+    return self.ilines[il, xl, t]
+
+  def __array__(self, dtype=None):
+    return np.asarray(self.ilines[()], dtype=dtype)
+
+def _open_transposed(filename):
+  """
+  HDF5 copy of a SEGY file written by convertToHDF5, if there is one at 
+  least as recent as the file. None otherwise
+  """
+  path = _hdf5_path(filename)
+  if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(filename):
+    return None
 
-      cube = dict({"data": data,
+  import h5py
+  return _TransposedCube(h5py.File(path, 'r'))
+
+def convertToHDF5(filename, block_bytes=256 * 2**20):
+  """
+  Write a SEGY cube to HDF5 three times, with inlines, crosslines and time
+  as the leading axis, so every inline, crossline and timeslice is one 
+  contiguous read. openSegy3D uses the copy when it is present
+
+  INPUT:
+
+  filename: SEGY file. The copy is written next to it, with extension .h5
+
+  block_bytes: amount of the cube held in memory at a time while writing
+
+  OUTPUT:
+
+  path of the HDF5 file
+  """
+  import segyio
+  import h5py
+
+  f = _open_segy(filename)
+  data = _memmap_cube(f, filename)
+  if data is None:
+    data = segyio.tools.cube(f)
+  nx, ny, nz = data.shape
+
+  path = _hdf5_path(filename)
+  with h5py.File(path, 'w') as h5:
+    ilines = h5.create_dataset('ilines', data.shape, np.float32, 
+                               chunks=(1, ny, nz))
+    xlines = h5.create_dataset('xlines', (ny, nx, nz), np.float32, 
+                               chunks=(1, nx, nz))
+    depth = h5.create_dataset('depth', (nz, nx, ny), np.float32, 
+                              chunks=(1, nx, ny))
+
+    # Inline and crossline copies one line at a time, the time-major copy 
+    # in blocks of samples, each read in a single pass over the file
+    for i in range(nx):
+      ilines[i] = data[i]
+    for j in range(ny):
+      xlines[j] = data[:,j,:]
+    step = max(1, block_bytes // (nx * ny * 4))
+    for k in range(0, nz, step):
+      depth[k:k+step] = np.moveaxis(data[:,:,k:k+step], -1, 0)
+
+  return path
+
+# See Stackoverflow: https://stackoverflow.com/questions/4984647/accessing-dict-keys-like-an-attribute
+# Defined once here, not per openSegy3D call
+class AttrDict(dict):
+  def __init__(self, *args, **kwargs):
+    super(AttrDict, self).__init__(*args, **kwargs)
+    self.__dict__ = self  
+
+def openSegy3D(filename, memmap=True, rotation=True):
+  """
+  Open 3D seismic volume in SEGY or SGY format 
+
+  memmap: Option for large cubes. Default is True
+    * True : cube.data is memory mapped, samples are read from disk only 
+             when sliced. Files that cannot be mapped are read whole.
+             If convertToHDF5 wrote a copy of the file, cube.data reads 
+             inlines, crosslines and timeslices from it instead, each as 
+             one contiguous read. That copy keeps the HDF5 file open until
+             cube.data.close() or the cube is released
+    * False: the whole cube is read into memory from the SEGY file
+
+  rotation: Option to print the survey rotation. Default is True
+
+  Files segyio cannot read raise its error instead of returning nothing.
+
+  ZFP-compressed cubes (.sgz, from seismic-zfp, e.g. 
+  `seismic-zfp convert file.sgy file.sgz --bitrate 4`) are decompressed 
+  into memory, reading several times fewer bytes from disk than SEGY
+  """
+  if filename.lower().endswith('.sgz'):
+    return _openSgz3D(filename)
+
+  import segyio
+
+  f = _open_segy(filename)
+
+  data = None
+  if memmap:
+    data = _open_transposed(filename)
+  if data is None and memmap:
+    data = _memmap_cube(f, filename)
+  if data is None:
+    data = segyio.tools.cube(f)
+
+  inlines = f.ilines
+  crosslines = f.xlines
+  twt = f.samples
+  sample_rate = segyio.tools.dt(f) / 1000
+
+  print('Successfully read \n')
+  print('Inline range from', inlines[0], 'to', inlines[-1])
+  print('Crossline range from', crosslines[0], 'to', crosslines[-1])
+  print('TWT from', twt[0], 'to', twt[-1])   
+  print('Sample rate:', sample_rate, 'ms')  
+
+  if rotation:
+    try:
+      rot, cdpx, cdpy = segyio.tools.rotation(f, line="fast")
+      print('Survey rotation: {:.2f} deg'.format(rot))      
+    except Exception:
+      print("Survey rotation not recognized")  
+
+  cube = dict({"data": data,
+               "inlines": inlines,
+               "crosslines": crosslines,
+               "twt": twt,
+               "sample_rate": sample_rate})
+
+  cube = AttrDict(cube)
+
+  return cube 
+
+def _openSgz3D(filename):
+  """
+  Open a seismic-zfp compressed cube as openSegy3D does a SEGY file
+  """
+  from seismic_zfp.read import SgzReader
+
+  with SgzReader(filename) as reader:
+    data = reader.read_volume()
+    inlines = np.asarray(reader.ilines)
+    crosslines = np.asarray(reader.xlines)
+    twt = np.asarray(reader.zslices)
+  sample_rate = float(twt[1] - twt[0]) if len(twt) > 1 else 0.0
+
+  print('Successfully read \n')
+  print('Inline range from', inlines[0], 'to', inlines[-1])
+  print('Crossline range from', crosslines[0], 'to', crosslines[-1])
+  print('TWT from', twt[0], 'to', twt[-1])   
+  print('Sample rate:', sample_rate, 'ms')  
+
+  return AttrDict({"data": data,
                    "inlines": inlines,
                    "crosslines": crosslines,
                    "twt": twt,
                    "sample_rate": sample_rate})
-      
-      # See Stackoverflow: https://stackoverflow.com/questions/4984647/accessing-dict-keys-like-an-attribute
-      class AttrDict(dict):
-          def __init__(self, *args, **kwargs):
-              super(AttrDict, self).__init__(*args, **kwargs)
-              self.__dict__ = self  
-
-      cube = AttrDict(cube)
 
-  except:
-    print("openSegy cannot read your data")  
-
-  return cube 
+def _axis_index(array, loc, nearest=False):
+  """
+  Position of loc in an inline, crossline or TWT array. segyio returns these 
+  sorted, so a binary search finds it; other orderings fall back to a scan.
+  With nearest, the closest position of a sorted array is returned, for 
+  slider values that miss a TWT sample by float rounding
+  """
+  id = np.searchsorted(array, loc)
+  if nearest:
+    id = min(max(id, 1), len(array) - 1)
+    return id - 1 if loc - array[id - 1] <= array[id] - loc else id
+  if id < len(array) and array[id] == loc:
+    return id
+
+  match = np.flatnonzero(array == loc)
+  if len(match) == 0:
+    raise ValueError("{} is not in the cube (range {} to {})".format(
+                     loc, array[0], array[-1]))
+  return match[0]
+
+# Time-major (twt, inline, crossline) copies of cubes, by id of the data
+# array, made on the first timeslice and dropped with the cube. Each costs 
+# as much memory as its cube; set the limit to 0 to never make them
+_TIME_MAJOR = {}
+_TIME_MAJOR_MAX_BYTES = 2 * 2**30
+
+def _timeslice(data, index):
+  """
+  Timeslice at index of a cube. A timeslice gathers one sample per trace, a
+  whole trace apart in memory, so in-memory cubes up to 
+  _TIME_MAJOR_MAX_BYTES are copied once to time-major order where every 
+  timeslice is contiguous. The copy doubles the memory held for the cube.
+  Memory-mapped cubes are never copied, as that would read the whole file 
+  into memory which the memmap is there to avoid
+  """
+  if not isinstance(data, np.ndarray) or isinstance(data, np.memmap) or \
+     data.nbytes > _TIME_MAJOR_MAX_BYTES:
+    return data[:,:,index]
+
+  key = id(data)
+  if key not in _TIME_MAJOR:
+    try:
+      weakref.finalize(data, _TIME_MAJOR.pop, key, None)
+    except TypeError:
+      return data[:,:,index]
+    tmajor = np.ascontiguousarray(np.moveaxis(data, -1, 0))
+    tmajor.setflags(write=False)
+    _TIME_MAJOR[key] = tmajor
+
+  return _TIME_MAJOR[key][index]
 
 def sliceCube(cube, type='il', 
               inline_loc=400, 
@@ -57,6 +380,11 @@ def sliceCube(cube, type='il',
   
   NOTE: Static display. If you want interactive display, use: sliceViewer
 
+  NOTE: The first timeslice of a cube held in memory (up to 2 GB, not 
+  memory-mapped) makes a time-major copy of it, so later timeslices are 
+  fast. This holds a second copy of the cube in memory until the cube 
+  is released.
+
   INPUT:
 
   cube: 3D seismic output of openSegy3D
@@ -91,87 +419,192 @@ def sliceCube(cube, type='il',
   plot  : Seismic display, if display=False is specified
   """
 
-  import numpy as np
-  import matplotlib.pyplot as plt
-
   # Unwrap cube
   inline_array, xline_array, timeslice_array = cube.inlines, cube.crosslines, cube.twt
   cube = cube.data
 
-  if type == 'il':
-    id = np.where(inline_array == inline_loc)[0][0]
-    inline_slice = cube[id,:,:]
-    
-    if display == False:
-      return(inline_slice)
-        
-    if display == True:
-      plt.figure(figsize=figsize)
-      plt.title('Inline {}'.format(inline_loc), size=20, pad=20)
-      extent = [xline_array[0], xline_array[-1], timeslice_array[-1], timeslice_array[0]]
-
-      p1 = plt.imshow(inline_slice.T, cmap=cmap, aspect='auto', extent=extent,
-                      vmin=vmin, vmax=vmax)
-
-      plt.colorbar()
-      plt.xlabel('Crossline', size=15); plt.ylabel('TWT', size=15)
-      plt.show()
-
-  if type == 'xl':
-
-    id = np.where(xline_array == xline_loc)[0][0]
-    xline_slice = cube[:,id,:]
-
-    if display == False:
-      return(xline_slice)
-    
-    if display == True:
-      plt.figure(figsize=figsize)
-      plt.title('Crossline {}'.format(xline_loc), size=20, pad=20)
-      extent = [inline_array[0], inline_array[-1], timeslice_array[-1], timeslice_array[0]]
-
-      p1 = plt.imshow(xline_slice.T, cmap=cmap, aspect='auto', extent=extent, 
-                      vmin=vmin, vmax=vmax)
-
-      plt.colorbar()
-      plt.xlabel('Inline', size=15); plt.ylabel('TWT', size=15)
-      plt.show()
-  
-  if type == 'ts':
+  # Per type: location, its axis, the slice at a position, title, extent 
+  # and axis labels
+  slices = {'il': (inline_loc, inline_array, lambda id: cube[id,:,:], 
+                   'Inline {}', 
+                   [xline_array[0], xline_array[-1], timeslice_array[-1], timeslice_array[0]], 
+                   'Crossline', 'TWT'),
+            'xl': (xline_loc, xline_array, lambda id: cube[:,id,:], 
+                   'Crossline {}', 
+                   [inline_array[0], inline_array[-1], timeslice_array[-1], timeslice_array[0]], 
+                   'Inline', 'TWT'),
+            'ts': (timeslice_loc, timeslice_array, lambda id: _timeslice(cube, id), 
+                   'Timeslice {} ms', 
+                   [inline_array[0], inline_array[-1], xline_array[-1], xline_array[0]], 
+                   'Inline', 'Crossline')}
+  if type not in slices:
+    raise ValueError("Unknown slice type '{}'".format(type))
+
+  # A lazily read cube (e.g. a Dask array) is evaluated here, once, only 
+  # over the chunks the slice touches; NumPy and memmap slices stay views
+  loc, array, slicer, title, extent, xlabel, ylabel = slices[type]
+  section = np.asarray(slicer(_axis_index(array, loc)))
+
+  if display == False:
+    return(section)
+
+  if display == True:
+    plt.figure(figsize=figsize)
+    plt.title(title.format(loc), size=20, pad=20)
+
+    plt.imshow(section.T, cmap=cmap, aspect='auto', extent=extent, 
+               vmin=vmin, vmax=vmax)
+
+    plt.colorbar()
+    plt.xlabel(xlabel, size=15); plt.ylabel(ylabel, size=15)
+    if type == 'ts':
+      plt.xlim(min(inline_array), max(inline_array))
+      plt.ylim(min(xline_array), max(xline_array))
+      plt.axis('equal')
+    plt.show()
 
-    id = np.where(timeslice_array == timeslice_loc)[0][0]
-    tslice = cube[:,:,id]
+def _quantize_int16(data, data_min, data_max):
+  """
+  int16 copy of a cube spanning [data_min, data_max] over the full int16 
+  range, converted one inline at a time. Returns the copy and the 
+  amplitude step of one int16 count
+  """
+  scale = (data_max - data_min) / 65535 or 1.0
 
-    if display == False:
-      return(tslice)
+  quantized = np.empty(data.shape, dtype=np.int16)
+  for i in range(data.shape[0]):
+    np.rint((data[i] - data_min) / scale - 32768, out=quantized[i], 
+            casting='unsafe')
 
-    if display == True:
+  return quantized, scale
 
-      plt.figure(figsize=figsize)
-      plt.title('Timeslice {} ms'.format(timeslice_loc), size=20, pad=20)
-      extent = [inline_array[0], inline_array[-1], xline_array[-1], xline_array[0]]
+def _cube_int16(cube):
+  """
+  int16 copy of a cube over its amplitude range and the amplitude step of 
+  one count, made once and kept on the cube as cube.data_int16 and 
+  cube.int16_scale for every later viewer of it
+  """
+  if getattr(cube, 'data_int16', None) is None:
+    data_min, data_max, _ = _cube_stats(cube)
+    cube.data_int16, cube.int16_scale = _quantize_int16(cube.data, data_min, 
+                                                        data_max)
+  return cube.data_int16, cube.int16_scale
 
-      p1 = plt.imshow(tslice.T, cmap=cmap, aspect='auto', extent=extent, 
-                      vmin=vmin, vmax=vmax)
+def _resample_for_display(image, fig=None, use_gpu=False, transpose=False):
+  """
+  Image resampled bicubically, once, to the pixel size of the figure 
+  (default: the current figure), so imshow draws it with 'nearest' 
+  instead of running its own bicubic resampler on every draw. With 
+  use_gpu, the resampling runs on the GPU when cupy is installed.
+
+  With transpose, the image is displayed transposed. The slice is 
+  resampled in its own memory order and only the figure-sized result is 
+  transposed, as a view
+  """
+  fig = plt.gcf() if fig is None else fig
+  width, height = fig.get_size_inches() * fig.dpi
+  if transpose:
+    factors = (width / image.shape[0], height / image.shape[1])
+  else:
+    factors = (height / image.shape[0], width / image.shape[1])
+
+  if use_gpu and cp is not None:
+    # cupy takes native byte order only (SEGY memmaps are big-endian)
+    image = cp.asarray(image.astype(image.dtype.newbyteorder('='), copy=False))
+    image = cp.asnumpy(cp_ndimage.zoom(image, factors, order=3, prefilter=False))
+    return image.T if transpose else image
+
+  image = ndimage.zoom(image, factors, order=3, prefilter=False)
+  return image.T if transpose else image
+
+def _to_uint8(image, lo, hi, out=None):
+  """
+  Image clipped to [lo, hi] and scaled to the 0-255 levels of a uint8 
+  array (out, if given), a quarter of the bytes of float32 for imshow to 
+  colormap, with no normalization of its own left to do
+  """
+  scaled = np.subtract(image, lo, dtype=np.float32)
+  scaled *= 255 / ((hi - lo) or 1)
+  np.clip(scaled, 0, 255, out=scaled)
 
-      plt.colorbar()
-      plt.xlabel('Inline', size=15); plt.ylabel('Crossline', size=15)
-      plt.xlim(min(inline_array), max(inline_array))
-      plt.ylim(min(xline_array), max(xline_array))
-      plt.axis('equal')
-      plt.show()  
+  if out is None:
+    out = np.empty(image.shape, np.uint8)
+  np.rint(scaled, out=out, casting='unsafe')
+  return out
 
-def sliceViewer(cube, cube_name=" "):
+def _cube_stats(cube, block_bytes=256 * 2**20):
+  """
+  Amplitude range, 1st/99th percentiles, mean and standard deviation of a 
+  cube, kept on the cube as cube.vmin, cube.vmax, cube.clip, cube.mean and 
+  cube.std once computed. The cube is streamed in blocks of inlines, never 
+  held whole. Block means and variances are merged in float64 (Chan et 
+  al.'s pairwise update of Welford's), percentiles are estimated from 
+  every 4th trace and sample
+  """
+  if getattr(cube, 'vmin', None) is None:
+    data = cube.data
+    step = max(1, block_bytes // (4 * int(np.prod(data.shape[1:]))))
+
+    vmin, vmax, sample = np.inf, -np.inf, []
+    n, mean, m2 = 0, 0.0, 0.0
+    for i in range(0, data.shape[0], step):
+      block = np.asarray(data[i:i+step])
+      vmin, vmax = min(vmin, float(block.min())), max(vmax, float(block.max()))
+      sample.append(block[::4,::4,::4].ravel())
+
+      n_block = block.size
+      mean_block = float(block.mean(dtype=np.float64))
+      delta = mean_block - mean
+      m2 += float(block.var(dtype=np.float64)) * n_block + delta**2 * n * n_block / (n + n_block)
+      mean += delta * n_block / (n + n_block)
+      n += n_block
+
+    cube.vmin, cube.vmax = vmin, vmax
+    cube.clip = tuple(float(p) for p in np.percentile(np.concatenate(sample), (1, 99)))
+    cube.mean, cube.std = mean, (m2 / n) ** 0.5
+
+  return cube.vmin, cube.vmax, cube.clip
+
+# Bytes of slices each sliceViewer keeps for revisits and reads ahead
+_VIEWER_SLICES_BYTES = 256 * 2**20
+
+# Threads reading slices ahead for every sliceViewer, started on first use.
+# One pool for all viewers, so re-running a viewer cell adds no threads
+_VIEWER_POOL = None
+_VIEWER_POOL_LOCK = threading.Lock()
+
+def _viewer_pool():
+  global _VIEWER_POOL
+  with _VIEWER_POOL_LOCK:
+    if _VIEWER_POOL is None:
+      _VIEWER_POOL = ThreadPoolExecutor(max_workers=2, 
+                                        thread_name_prefix='sliceViewer')
+      # Reads still queued at exit are dropped, not waited for
+      atexit.register(_VIEWER_POOL.shutdown, wait=False, cancel_futures=True)
+  return _VIEWER_POOL
+
+def sliceViewer(cube, cube_name=" ", quantize=False, use_gpu=True):
   """
   Interactive viewer of 2D slice from a 3D seismic volume data
 
   NOTE: Interactive display. If you want static display, use: sliceCube
 
+  quantize: Option for large cubes. Default is False
+    * True : the viewer works on an int16 copy of the cube, made once per 
+             cube, half the bytes of float32 on every redraw (65536 
+             amplitude levels, far more than a colormap shows). Colorbars 
+             still read in amplitude
+
+  use_gpu: Option for resampling slices to the figure size. Default is True
+    * True : on the GPU if cupy is installed, otherwise on the CPU
+    * False: always on the CPU
+
+  Each viewer keeps up to 256 MB of recently shown slices and of the 
+  neighbouring slices it reads ahead in the background
   """
-  from ipywidgets import interact, interactive, fixed, interact_manual, ToggleButtons
+  from ipywidgets import interact, ToggleButtons
   import ipywidgets as widgets
-  import numpy as np
-  import matplotlib.pyplot as plt
+  from IPython.display import display
 
   # Access data and properties of cube
   data, inlines, crosslines, twt, sample_rate = cube.data, cube.inlines,\
@@ -184,74 +617,584 @@ def sliceViewer(cube, cube_name=" "):
   cmap_button = ToggleButtons(description='Colormaps',
                               options=['gray','seismic','RdBu','PuOr','Accent'])
   
-  inline_loc = widgets.IntSlider(value=min(inlines), min=min(inlines), 
-                                 max=max(inlines))
-  xline_loc = widgets.IntSlider(value=min(crosslines), min=min(crosslines), 
-                                max=max(crosslines))
-  timeslice_loc = widgets.FloatSlider(value=min(twt), min=min(twt), 
-                                      max=max(twt), step=sample_rate)
-  vmin = widgets.FloatSlider(value=np.amin(data), min=np.amin(data), 
-                             max=np.amax(data))
-  vmax = widgets.FloatSlider(value=np.amax(data), min=np.amin(data), 
-                             max=np.amax(data))
+  # Axis ranges, and amplitude range kept on the cube (segyio axes are sorted)
+  il_min, il_max = int(inlines[0]), int(inlines[-1])
+  xl_min, xl_max = int(crosslines[0]), int(crosslines[-1])
+  twt_min, twt_max = float(twt[0]), float(twt[-1])
+  data_min, data_max, (clip_min, clip_max) = _cube_stats(cube)
+
+  # Sliders redraw once, on release, not for every step passed while dragging
+  # Steps of the line numbering, so decimated surveys only offer their lines
+  il_step = int(inlines[1] - inlines[0]) if len(inlines) > 1 else 1
+  xl_step = int(crosslines[1] - crosslines[0]) if len(crosslines) > 1 else 1
+  inline_loc = widgets.IntSlider(value=il_min, min=il_min, max=il_max, 
+                                 step=il_step, continuous_update=False)
+  xline_loc = widgets.IntSlider(value=xl_min, min=xl_min, max=xl_max, 
+                                step=xl_step, continuous_update=False)
+  timeslice_loc = widgets.FloatSlider(value=twt_min, min=twt_min, 
+                                      max=twt_max, step=sample_rate, 
+                                      continuous_update=False)
+  vmin = widgets.FloatSlider(value=clip_min, min=data_min, max=data_max, 
+                             continuous_update=False)
+  vmax = widgets.FloatSlider(value=clip_max, min=data_min, max=data_max, 
+                             continuous_update=False)
+
+  # Displayed values from amplitude
+  to_display = lambda amplitude: amplitude
+  if quantize:
+    data, scale = _cube_int16(cube)
+    to_display = lambda amplitude: (amplitude - data_min) / scale - 32768
+
+  # Slices are drawn as 8-bit levels of the current amplitude limits, the 
+  # colorbar labels them back in amplitude
+  clim = [data_min, data_max]
+  colorbar_format = FuncFormatter(
+    lambda value, pos: '{:.4g}'.format(clim[0] + value * (clim[1] - clim[0]) / 255))
+
+  # Recently shown slices by (selection, index), most recent last, so 
+  # scrubbing back and forth reads each slice from the cube only once. 
+  # Entries are futures and their size: the neighbours of a shown slice are
+  # read ahead in the background (memmap and HDF5 reads release the GIL). 
+  # All of them together are held to _VIEWER_SLICES_BYTES
+  slices = OrderedDict()
+  held = [0]
+  lock = threading.Lock()
+  itemsize = np.dtype(data.dtype).itemsize
+  nbytes = {'Inline': data.shape[1] * data.shape[2] * itemsize, 
+            'Crossline': data.shape[0] * data.shape[2] * itemsize, 
+            'Timeslice': data.shape[0] * data.shape[1] * itemsize}
+
+  def fill(future, slicer, index):
+    try:
+      future.set_result(np.array(slicer(index)))
+    except BaseException as e:
+      future.set_exception(e)
+
+  def read(type, index, slicer, prefetch=False):
+    # Reading ahead would evict the shown slice when only a few fit
+    if prefetch and 3 * nbytes[type] > _VIEWER_SLICES_BYTES:
+      return None
+
+    key = (type, index)
+    with lock:
+      new = key not in slices
+      if new:
+        slices[key] = Future(), nbytes[type]
+        held[0] += nbytes[type]
+        while held[0] > _VIEWER_SLICES_BYTES and len(slices) > 1:
+          held[0] -= slices.popitem(last=False)[1][1]
+      else:
+        slices.move_to_end(key)
+      future = slices[key][0]
+
+    if new and prefetch:
+      _viewer_pool().submit(fill, future, slicer, index)
+    elif new:
+      fill(future, slicer, index)
+    return None if prefetch else future.result()
+
+  # Per selection: position of a slider value in the cube, the slice at a
+  # position, number of slices, title, figure size, extent and axis labels. Built once, so a
+  # redraw only looks its selection up
+  views = {'Inline': (lambda loc: _axis_index(inlines, loc), 
+                      lambda i: data[i,:,:], len(inlines), 
+                      '{} Seismic at Inline {}', (20, 10), 
+                      [crosslines[0], crosslines[-1], twt[-1], twt[0]], 
+                      'Crossline', 'TWT'),
+           'Crossline': (lambda loc: _axis_index(crosslines, loc), 
+                         lambda i: data[:,i,:], len(crosslines), 
+                         '{} Seismic at Crossline {}', (20, 10), 
+                         [inlines[0], inlines[-1], twt[-1], twt[0]], 
+                         'Inline', 'TWT'),
+           'Timeslice': (lambda loc: _axis_index(twt, loc, nearest=True), 
+                         lambda i: _timeslice(data, i), len(twt), 
+                         '{} Seismic at Timeslice {} ms', (8, 10), 
+                         [inlines[0], inlines[-1], crosslines[-1], crosslines[0]], 
+                         'Inline', 'Crossline')}
+
+  # One figure per selection, built on its first draw. Redraws only swap
+  # the image data, limits and colormap of that figure
+  figures = {}
+  luts = {}
+  resampled = {}
+
+  def figure(type):
+    if type not in figures:
+      _, _, _, _, figsize, extent, xlabel, ylabel = views[type]
+      fig, ax = plt.subplots(figsize=figsize)
+      im = ax.imshow(np.zeros((1, 1), np.uint8), aspect='auto', extent=extent, 
+                     interpolation='nearest', vmin=0, vmax=255)
+      fig.colorbar(im, ax=ax, format=colorbar_format)
+      ax.set_xlabel(xlabel); ax.set_ylabel(ylabel)
+
+      if type == 'Timeslice':
+        ax.xaxis.set_ticks_position('top') # axis on top
+        ax.xaxis.set_label_position('top') # label on top
+        ax.set_xlim(il_min, il_max)
+        ax.set_ylim(xl_min, xl_max)
+        ax.axis('equal')
+
+      plt.close(fig) # shown by the callback only, not again by pyplot
+      figures[type] = fig, ax, im, None
+    return figures[type]
 
   @interact   
   def f(type=type, inline_loc=inline_loc, xline_loc=xline_loc,
         timeslice_loc=timeslice_loc, vmin=vmin, vmax=vmax, cmap=cmap_button):  
     
-    if type == 'Inline':
+    loc = {'Inline': inline_loc, 'Crossline': xline_loc, 
+           'Timeslice': timeslice_loc}[type]
+    locate, slicer, n, title, _, _, _, _ = views[type]
+    index = locate(loc)
+    fig, ax, im, out = figure(type)
+
+    # Slices are stored (x, twt) and displayed (twt, x). The last slice 
+    # resampled for each figure is kept, so moving only vmin, vmax or the 
+    # colormap redraws without reading or resampling again
+    if resampled.get(type, (None,))[0] != index:
+      resampled[type] = index, _resample_for_display(read(type, index, slicer), 
+                                                     fig, use_gpu, transpose=True)
+    image = resampled[type][1]
+
+    # The 8-bit level and RGBA buffers of a figure are reused while its 
+    # pixel size holds
+    if out is None or out[0].shape != image.shape:
+      out = np.empty(image.shape, np.uint8), np.empty(image.shape + (4,), np.uint8)
+      figures[type] = fig, ax, im, out
+    levels, rgba = out
+
+    # Levels are colored by one lookup in the colormap's 256 RGBA entries, 
+    # so imshow draws the RGBA image as is. The image keeps the colormap 
+    # for its colorbar
+    im.set_cmap(cmap)
+    if cmap not in luts:
+      luts[cmap] = im.get_cmap()(np.linspace(0, 1, 256), bytes=True)
+
+    clim[:] = vmin, vmax
+    _to_uint8(image, to_display(vmin), to_display(vmax), levels)
+    im.set_data(np.take(luts[cmap], levels, axis=0, out=rgba))
+    ax.set_title(title.format(cube_name, loc))
+    fig.canvas.draw_idle()
+    display(fig)
+
+    for i in (index - 1, index + 1):
+      if 0 <= i < n:
+        read(type, i, slicer, prefetch=True)
+
+# Attribute classes live in seismic/attributes and are only imported when
+# first needed, so seistool can be imported before that folder is on sys.path.
+# Each entry is (module, class, whether the user kernel is used for ghosting)
+_ATTRIBUTE_CLASSES = {'Amplitude': ('SignalProcess', 'SignalProcess', True),
+                      'CompleTrace': ('CompleTrace', 'ComplexAttributes', True),
+                      'DipAzm': ('DipAzm', 'DipAzm', False),
+                      'EdgeDetection': ('EdgeDetection', 'EdgeDetection', True)}
+
+# One instance per attribute class, shared by every sliceAttribute call
+_HANDLERS = {}
+
+def _handler(attribute_class):
+  """
+  Return the shared instance of an attribute class
+  """
+  if attribute_class not in _HANDLERS:
+    if attribute_class not in _ATTRIBUTE_CLASSES:
+      raise ValueError("Unknown attribute class '{}'".format(attribute_class))
 
-      # with segyio.open(filename) as f: 
-      inline_slice = data[inline_loc-inlines[0],:,:]  
+    module, name, _ = _ATTRIBUTE_CLASSES[attribute_class]
+    _HANDLERS[attribute_class] = getattr(importlib.import_module(module), name)()
 
-      plt.figure(figsize=(20, 10))
-      plt.title('{} Seismic at Inline {}'.format(cube_name, inline_loc))
-      extent = [crosslines[0], crosslines[-1], twt[-1], twt[0]]
+  return _HANDLERS[attribute_class]
 
-      p1 = plt.imshow(inline_slice.T, cmap=cmap, aspect='auto', extent=extent,
-                      vmin=vmin, vmax=vmax, interpolation='bicubic')
-      plt.colorbar()
+def _curvature(x, darray, **kwargs):
+  # compute first inline and xline dips
+  darray_il, darray_xl = _handler('DipAzm').gradient_dips(darray, dip_factor=10, 
+                                                         kernel=(3,3,3), 
+                                                         preview=None)
+  # compute curvature
+  return x.volume_curvature(darray_il, darray_xl, dip_factor=10, 
+                            kernel=(3,3,3), preview=None) 
+
+# Every attribute as (attribute_type, attribute_class, computation). The 
+# computation is called with the class instance, the Dask array and the 
+# sliceAttribute options
+_ATTRIBUTES = (
+  ('fder', 'Amplitude',
+    lambda x, d, **kw: x.first_derivative(d, axis=-1, preview=None)),
+  ('sder', 'Amplitude',
+    lambda x, d, **kw: x.second_derivative(d, axis=-1, preview=None)),
+  ('rms', 'Amplitude',
+    lambda x, d, **kw: x.rms(d, kernel=(1,1,9), preview=None)),
+  ('gradmag', 'Amplitude',
+    lambda x, d, **kw: x.gradient_magnitude(d, sigmas=(1,1,1), preview=None)),
+  ('reflin', 'Amplitude',
+    lambda x, d, **kw: x.reflection_intensity(d, kernel=(1,1,9), preview=None)),
+
+  ('enve', 'CompleTrace',
+    lambda x, d, **kw: x.envelope(d, preview=None)),
+  ('inphase', 'CompleTrace',
+    lambda x, d, **kw: x.instantaneous_phase(d, preview=None)),
+  ('cosphase', 'CompleTrace',
+    lambda x, d, **kw: x.cosine_instantaneous_phase(d, preview=None)),
+  ('ampcontrast', 'CompleTrace',
+    lambda x, d, **kw: x.relative_amplitude_change(d, preview=None)),
+  ('ampacc', 'CompleTrace',
+    lambda x, d, **kw: x.amplitude_acceleration(d, preview=None)),
+  ('infreq', 'CompleTrace',
+    lambda x, d, **kw: x.instantaneous_frequency(d, sample_rate=4, preview=None)),
+  ('inband', 'CompleTrace',
+    lambda x, d, **kw: x.instantaneous_bandwidth(d, preview=None)),
+  ('domfreq', 'CompleTrace',
+    lambda x, d, **kw: x.dominant_frequency(d, sample_rate=4, preview=None)),
+  ('freqcontrast', 'CompleTrace',
+    lambda x, d, **kw: x.frequency_change(d, sample_rate=4, preview=None)),
+  ('sweet', 'CompleTrace',
+    lambda x, d, **kw: x.sweetness(d, sample_rate=4, preview=None)),
+  ('quality', 'CompleTrace',
+    lambda x, d, **kw: x.quality_factor(d, sample_rate=4, preview=None)),
+  ('resphase', 'CompleTrace',
+    lambda x, d, **kw: x.response_phase(d, preview=None)),
+  ('resfreq', 'CompleTrace',
+    lambda x, d, **kw: x.response_frequency(d, sample_rate=4, preview=None)),
+  ('resamp', 'CompleTrace',
+    lambda x, d, **kw: x.response_amplitude(d, preview=None)),
+  ('apolar', 'CompleTrace',
+    lambda x, d, **kw: x.apparent_polarity(d, preview=None)),
+
+  # result is il_dip, xl_dip
+  ('dipgrad', 'DipAzm',
+    lambda x, d, **kw: x.gradient_dips(d, dip_factor=10, kernel=(3,3,3), 
+                                       preview=None)),
+  # result is gi2, gj2, gk2, gigj, gigk, gjgk
+  ('gst', 'DipAzm',
+    lambda x, d, **kw: x.gradient_structure_tensor(d, kw['kernel'], 
+                                                   preview=None)),
+  # result is il_dip, xl_dip
+  ('gstdip2d', 'DipAzm',
+    lambda x, d, **kw: x.gst_2D_dips(d, dip_factor=10, kernel=(3,3,3), 
+                                     preview=None)),
+  ('gstdip3d', 'DipAzm',
+    lambda x, d, **kw: x.gst_3D_dip(d, dip_factor=10, kernel=(3,3,3), 
+                                    preview=None)),
+  ('gstazm3d', 'DipAzm',
+    lambda x, d, **kw: x.gst_3D_azm(d, dip_factor=10, kernel=(3,3,3), 
+                                    preview=None)),
+
+  ('semblance', 'EdgeDetection',
+    lambda x, d, **kw: x.semblance(d, kernel=(3,3,9), preview=None)),
+  ('gstdisc', 'EdgeDetection',
+    lambda x, d, **kw: x.gradient_structure_tensor(d, kernel=(3,3,9), 
+                                                   preview=None)),
+  ('eigen', 'EdgeDetection',
+    lambda x, d, **kw: x.eig_complex(d, kernel=(3,3,9), preview=None)),
+  ('chaos', 'EdgeDetection',
+    lambda x, d, **kw: x.chaos(d, kernel=(3,3,9), preview=None)),
+  # result is H, K, Kmax, Kmin, KMPos, KMNeg
+  ('curv', 'EdgeDetection', _curvature),
+)
+
+# Attribute types in the order of _ATTRIBUTES, so an AttrType indexes the 
+# tables below directly
+AttrType = IntEnum('AttrType', [t.upper() for t, _, _ in _ATTRIBUTES], start=0)
+
+_COMPUTE_DISPATCH = tuple(op for _, _, op in _ATTRIBUTES)
+_ATTRIBUTE_CLASS_OF = tuple(c for _, c, _ in _ATTRIBUTES)
+_STR_TO_ENUM = {t: AttrType(i) for i, (t, _, _) in enumerate(_ATTRIBUTES)}
+
+def _attribute_enum(attribute_class, attribute_type):
+  """
+  Convert an attribute type string to AttrType and check it belongs to the
+  attribute class
+  """
+  if not isinstance(attribute_type, AttrType):
+    if attribute_type not in _STR_TO_ENUM:
+      raise ValueError("Unknown attribute type '{}'".format(attribute_type))
+    attribute_type = _STR_TO_ENUM[attribute_type]
 
-      plt.xlabel('Crossline'); plt.ylabel('TWT')
-      plt.show()
+  if _ATTRIBUTE_CLASS_OF[attribute_type] != attribute_class:
+    raise ValueError("Unknown attribute type '{}' for class '{}'".format(
+                     attribute_type.name.lower(), attribute_class))
 
-    if type == 'Crossline':
+  return attribute_type
 
-      # with segyio.open(filename) as f:
-      xline_slice = data[:,xline_loc-crosslines[0],:]  
+def _make_dask(darray, output, attribute_class, kernel):
+  """
+  Wrap the input of sliceAttribute into a Dask array with the shared 
+  instance of its attribute class
+  """
+  x = _handler(attribute_class)
+  if not _ATTRIBUTE_CLASSES[attribute_class][2]:
+    kernel = None
 
-      plt.figure(figsize=(20, 10))
-      plt.title('{} Seismic at Crossline {}'.format(cube_name, xline_loc))
-      extent = [inlines[0], inlines[-1], twt[-1], twt[0]]
+  if output == '2d':
+    # A single slice is one block. compute_chunk_size cannot split the 
+    # leading singleton axis of the (1, traces, samples) slice layout
+    import dask.array as da
+    darray = da.from_array(darray, chunks=darray.shape)
 
-      p1 = plt.imshow(xline_slice.T, cmap=cmap, aspect='auto', extent=extent, 
-                      vmin=vmin, vmax=vmax, interpolation='bicubic')
-      plt.colorbar()
+  darray, chunks_init = x.create_array(darray, kernel=kernel, preview=None)
+  # float32 keeps ample dynamic range and halves the memory traffic
+  darray = darray.astype(np.float32, copy=False)
 
-      plt.xlabel('Inline'); plt.ylabel('TWT')
-      plt.show()
-    
-    if type == 'Timeslice':
+  return(x, darray)
 
-      id = np.where(twt == timeslice_loc)[0][0]
-      tslice = data[:,:,id]
+def _compute(x, darray, attribute_class, attribute_type, kernel, 
+             sample_rate, dip_factor, axis):
+  """
+  Compute the requested attribute (AttrType) on the Dask array
+  """
+  operation = _COMPUTE_DISPATCH[attribute_type]
 
-      plt.figure(figsize=(8,10))
-      plt.title('{} Seismic at Timeslice {} ms'.format(cube_name, timeslice_loc))
-      extent = [inlines[0], inlines[-1], crosslines[-1], crosslines[0]]
+  return operation(x, darray, kernel=kernel, sample_rate=sample_rate, 
+                   dip_factor=dip_factor, axis=axis)
 
-      p1 = plt.imshow(tslice.T, cmap=cmap, aspect='auto', extent=extent, 
-                      vmin=vmin, vmax=vmax, interpolation='bicubic')
-      plt.colorbar()
+# Below this size a 2D slice is computed directly with NumPy, as building
+# and scheduling the Dask graph would cost more than the arithmetic itself
+_NUMPY_2D_MAX_BYTES = 256 * 2**20
 
+# Largest 2D result computed with the single-threaded Dask scheduler
+_SINGLE_THREADED_MAX_BYTES = 100 * 2**20
 
-      plt.xlabel('Inline'); plt.ylabel('Crossline')
-      plt.gca().xaxis.set_ticks_position('top') # axis on top
-      plt.gca().xaxis.set_label_position('top') # label on top
-      plt.xlim(min(inlines), max(inlines))
-      plt.ylim(min(crosslines), max(crosslines))
-      plt.axis('equal')
-      plt.show()   
+# Complex trace attributes that are pointwise functions of the analytic 
+# trace, called with the attributes util module and the analytic trace
+_ANALYTIC_DISPATCH = {
+  AttrType.ENVE: lambda util, a: util.envelope(a),
+  AttrType.INPHASE: lambda util, a: np.rad2deg(np.angle(a)),
+  AttrType.COSPHASE: lambda util, a: util.cosine_phase(a),
+}
+
+# Half the (1,1,25) window of the complex trace attribute classes, which 
+# extend every trace by this many reflected samples before their Hilbert 
+# transform
+_ANALYTIC_PAD = 12
+
+def _analytic_trace(util, data):
+  """
+  Analytic trace of data along its last axis, computed as the complex trace
+  attribute classes do on their ghosted blocks, so the NumPy paths return 
+  the same values as the Dask path
+  """
+  pad = [(0, 0)] * (data.ndim - 1) + [(_ANALYTIC_PAD, _ANALYTIC_PAD)]
+  analytic = util.hilbert(np.pad(data, pad, mode='symmetric'))
+
+  return analytic[..., _ANALYTIC_PAD:-_ANALYTIC_PAD]
+
+# Derivative attributes by the name of their operator in SignalProcess. On 
+# a single slice the separable filter runs directly on the NumPy array
+_DERIVATIVE_DISPATCH = {
+  AttrType.FDER: 'FIRST_DERIVATIVE',
+  AttrType.SDER: 'SECOND_DERIVATIVE',
+}
+
+# Attributes ghosting the leading axis deeper than one sample, by that depth.
+# Dask only ghosts up to the size of a block, so on the Dask path the one 
+# row of a 2D slice is repeated this many times. The rows stay identical, 
+# as with the reflected boundary of the NumPy path, and the first is kept
+_SLICE_ROWS = {
+  AttrType.SDER: 2,
+  AttrType.GRADMAG: 4,
+  AttrType.FREQCONTRAST: 2,
+}
+
+def _compute_2d(darray, attribute_class, attribute_type, kernel, 
+                sample_rate, dip_factor, axis, use_dask, async_compute=False):
+  """
+  Compute the attribute of a 2D slice, given with a leading singleton axis
+  and time (or the last axis of a timeslice) last, as a NumPy array. With
+  async_compute the lazy Dask array is returned instead
+  """
+  numpy_path = not use_dask and not async_compute and \
+               darray.nbytes <= _NUMPY_2D_MAX_BYTES
+
+  if numpy_path and attribute_type in _ANALYTIC_DISPATCH:
+    util = importlib.import_module('util')
+    operation = _ANALYTIC_DISPATCH[attribute_type]
+    return operation(util, _analytic_trace(util, darray))
+
+  if numpy_path and attribute_type in _DERIVATIVE_DISPATCH:
+    util = importlib.import_module('util')
+    operator = _DERIVATIVE_DISPATCH[attribute_type]
+    weights, smooth = getattr(importlib.import_module('SignalProcess'), operator)
+    return util.separable_correlate(darray, weights, smooth, axis=-1)
+
+  rows = _SLICE_ROWS.get(attribute_type, 1)
+  if rows > 1:
+    darray = np.repeat(darray, rows, axis=0)
+
+  x, darray = _make_dask(darray, '2d', attribute_class, kernel)
+  result = _compute(x, darray, attribute_class, attribute_type, kernel, 
+                    sample_rate, dip_factor, axis)
+  if rows > 1:
+    result = tuple(r[:1] for r in result) if isinstance(result, tuple) \
+             else result[:1]
+
+  if async_compute:
+    return result
+
+  return _compute_now(result)
+
+def _compute_now(result):
+  """
+  Compute the Dask array, or tuple of Dask arrays, of a 2D attribute
+  """
+  # Several outputs (dips, curvatures, GST) share their intermediate arrays,
+  # e.g. all six curvatures derive from the same dips. Computing them in one
+  # graph evaluates the shared part once, never materialising it
+  outputs = result if isinstance(result, tuple) else (result,)
+  nbytes = sum(out.nbytes for out in outputs)
+
+  # A slice is a handful of tasks, for which thread pool startup and 
+  # scheduling cost more than they save. Only large timeslices use threads
+  scheduler = 'single-threaded' if nbytes <= _SINGLE_THREADED_MAX_BYTES \
+              else 'threads'
+
+  import dask
+  outputs = dask.compute(*outputs, scheduler=scheduler)
+
+  return outputs if isinstance(result, tuple) else outputs[0]
+
+# 2D attributes computed from the (cached) result of another attribute of
+# the same slice: attribute_type -> (source type, computation on its result)
+_DERIVED_2D = {
+  AttrType.CURV: (AttrType.DIPGRAD, lambda dips: _curvature_from_dips(*dips)),
+}
+
+def _curvature_from_dips(il_dip, xl_dip):
+  """
+  Volume curvatures (H, K, Kmax, Kmin, KMPos, KMNeg) of a 2D slice from 
+  its computed inline and crossline dips
+  """
+  import dask.array as da
+  il_dip, xl_dip = [da.from_array(d, chunks=d.shape) for d in (il_dip, xl_dip)]
+
+  return _compute_now(_handler('EdgeDetection').volume_curvature(
+                      il_dip, xl_dip, dip_factor=10, kernel=(3,3,3), 
+                      preview=None))
+
+# For each type of slice: the sliceCube location keyword, and the cube keys
+# of the horizontal and vertical axis of the section
+_SLICE_TYPES = {'il': ('inline_loc', 'crosslines', 'twt'), 
+                'xl': ('xline_loc', 'inlines', 'twt'), 
+                'ts': ('timeslice_loc', 'inlines', 'crosslines')}
+
+# Computed 2D slices, most recently used last. Re-plotting the same slice 
+# with another cmap or vmin/vmax is then a lookup instead of a recompute
+_SLICE_CACHE = OrderedDict()
+_SLICE_CACHE_SIZE = 32
+
+def _forget_cube(cube_id):
+  """
+  Drop the cached slices of a cube that has been garbage collected
+  """
+  for key in [k for k in _SLICE_CACHE if k[0] == cube_id]:
+    del _SLICE_CACHE[key]
+
+def _cached_slice(key, cube, compute):
+  """
+  Return the cached 2D attribute under key, or compute and cache it. The
+  first item of key is id(cube), cleared when the cube is collected
+  """
+  if key in _SLICE_CACHE:
+    _SLICE_CACHE.move_to_end(key)
+    return _SLICE_CACHE[key]
+
+  result = compute()
+  outputs = result if isinstance(result, tuple) else (result,)
+  if not all(isinstance(out, np.ndarray) for out in outputs):
+    return result
+
+  try:
+    if not any(k[0] == key[0] for k in _SLICE_CACHE):
+      weakref.finalize(cube, _forget_cube, key[0])
+  except TypeError:
+    # cube cannot be weakly referenced, so an id could be reused
+    return result
+
+  # Shared between callers, so keep it from being modified in place
+  for out in outputs:
+    out.setflags(write=False)
+  _SLICE_CACHE[key] = result
+  if len(_SLICE_CACHE) > _SLICE_CACHE_SIZE:
+    _SLICE_CACHE.popitem(last=False)
+
+  return result
+
+# float32 input buffers of 2D attributes by (slice type, slice shape)
+_SLICE_BUFFERS = {}
+
+def _slice_buffer(type, shape):
+  """
+  Reusable (1, traces, samples) float32 buffer for a slice of this shape
+  """
+  key = (type, shape)
+  if key not in _SLICE_BUFFERS:
+    _SLICE_BUFFERS[key] = np.empty((1,) + shape, dtype=np.float32)
+
+  return _SLICE_BUFFERS[key]
+
+def _compute_analytic_3d(darray, operation):
+  """
+  Lazily compute a pointwise complex trace attribute of a whole cube in a 
+  single task per block. Blocks hold complete traces, so no ghosting and 
+  trimming of the cube is needed
+  """
+  util = importlib.import_module('util')
+  darray = _trace_blocks(darray)
+
+  attribute = lambda block: operation(util, _analytic_trace(util, block))
+
+  return darray.map_blocks(attribute, dtype=darray.dtype)
+
+def _trace_blocks(darray):
+  """
+  Cube as a float32 Dask array whose blocks hold complete traces
+  """
+  x = _handler('CompleTrace')
+  darray, chunks_init = x.create_array(darray, kernel=None, preview=None)
+
+  return darray.rechunk({2: -1}).astype(np.float32, copy=False)
+
+def _compute_multi(darray, output, attribute_class, attribute_types, kernel, 
+                   sample_rate, dip_factor, axis, use_dask):
+  """
+  Compute several attributes (AttrType) of the same 2D slice or 3D cube, 
+  returned as a dict keyed by attribute type string. The pointwise complex 
+  trace attributes all derive from a single analytic trace
+  """
+  results = {}
+
+  analytic_types = [t for t in attribute_types 
+                    if t in _ANALYTIC_DISPATCH and not use_dask]
+  if analytic_types:
+    util = importlib.import_module('util')
+
+    if output == '2d':
+      analytic = _analytic_trace(util, darray)
+      for t in analytic_types:
+        results[t] = _ANALYTIC_DISPATCH[t](util, analytic)
+
+    if output == '3d':
+      blocks = _trace_blocks(darray)
+      analytic = blocks.map_blocks(lambda b: _analytic_trace(util, b), 
+                                   dtype=np.result_type(blocks.dtype, 1j))
+      for t in analytic_types:
+        operation = _ANALYTIC_DISPATCH[t]
+        results[t] = analytic.map_blocks(lambda a, op=operation: op(util, a), 
+                                         dtype=blocks.dtype)
+
+  for t in attribute_types:
+    if t in results:
+      continue
+
+    if output == '2d':
+      results[t] = _compute_2d(darray, attribute_class, t, kernel, 
+                               sample_rate, dip_factor, axis, use_dask)
+
+    if output == '3d':
+      x, darray_t = _make_dask(darray, output, attribute_class, kernel)
+      results[t] = _compute(x, darray_t, attribute_class, t, kernel, 
+                            sample_rate, dip_factor, axis)
+
+  return {t.name.lower(): results[t] for t in attribute_types}
 
 def sliceAttribute(cube, output='2d', type='il', 
                    inline_loc=400, 
@@ -260,6 +1203,7 @@ def sliceAttribute(cube, output='2d', type='il',
                    attribute_class='CompleTrace', 
                    attribute_type='cosphase',
                    kernel=None, sample_rate=4, dip_factor=10, axis=-1,                   
+                   use_dask=False, async_compute=False, out_file=None, 
                    display=False, 
                    figsize=(10,5), cmap='plasma', vmin=None, vmax=None):
   
@@ -290,7 +1234,31 @@ def sliceAttribute(cube, output='2d', type='il',
     * 'DipAzm': dip and azimuth attributes
     * 'EdgeDetection': edge detection attributes
 
-  attribute_type: specify the attribute type (string). 
+  attribute_type: specify the attribute type (string, or AttrType member). 
+                  A list of types of the same class returns a dict of 
+                  attributes keyed by type; complex trace attributes in the 
+                  list share one Hilbert transform.
+
+  use_dask: Option for envelope, instantaneous phase and cosine of 
+            instantaneous phase (and first and second derivative in 2D).
+    * Default is False: a 2D slice is computed directly with NumPy, a 3D 
+      cube with one fused Dask task per block of whole traces
+    * If True: always compute through the Dask attribute classes
+
+  async_compute: Option for 2D output without display.
+    * Default is False: the attribute is computed before returning
+    * If True: the lazy Dask array is returned, so the slices of a loop can
+      be evaluated together with dask.compute(*results), or started in the 
+      background with result.persist() on a dask.distributed cluster
+
+  out_file: Option for 3D output.
+    * Default is None: the lazy Dask array of the attribute is returned
+    * If a path: the attribute is computed block by block into an HDF5 
+      file, so cubes larger than memory never have to be held, and the 
+      on-disk dataset (h5py.Dataset) is returned. It keeps the file open 
+      for reading until it is released or closed with result.file.close().
+      cube.data can likewise be any lazily read array (memmap, HDF5 
+      dataset), it is only read block by block
 
   display: Option to display.
     * Default is False: No display, but outputs the calculated attribute in 2D/3D array
@@ -336,251 +1304,46 @@ def sliceAttribute(cube, output='2d', type='il',
       * 'curv': volume curvature from 3D seismic dips
   """
 
-  import numpy as np
-  import matplotlib.pyplot as plt
-  import segyio
-
-  from seistool import sliceCube
-
-  from CompleTrace import ComplexAttributes
-  from DipAzm import DipAzm
-  from EdgeDetection import EdgeDetection
-  from Frequency import Frequency
-  from SignalProcess import SignalProcess
-
-  def make_dask(darray, output, attribute_class, attribute_type, kernel):
-
-    if output == '2d':
-
-      if attribute_class == 'Amplitude':
-        x = SignalProcess()
-        darray, chunks_init = SignalProcess.create_array(x, darray, kernel, 
-                                                         preview=None)
-        darray = darray.T
-
-      if attribute_class == 'CompleTrace':  
-        x = ComplexAttributes()
-        darray, chunks_init = ComplexAttributes.create_array(x, darray, kernel, 
-                                                             preview=None)
-        darray = darray.T 
-
-      if attribute_class == 'DipAzm':
-        x = DipAzm()
-        darray, chunks_init = DipAzm.create_array(x, darray, kernel=None, 
-                                                  preview=None)
-        darray = darray.T
-      
-      if attribute_class == 'EdgeDetection':  
-        x = EdgeDetection()
-        darray, chunks_init = EdgeDetection.create_array(x, darray, kernel, 
-                                                         preview=None)
-        darray = darray.T      
-
-    if output == '3d':
-
-      if attribute_class == 'Amplitude':
-        x = SignalProcess()
-        darray, chunks_init = SignalProcess.create_array(x, darray, kernel, 
-                                                         preview=None)
-
-      if attribute_class == 'CompleTrace':  
-        x = ComplexAttributes()
-        darray, chunks_init = ComplexAttributes.create_array(x, darray, kernel, 
-                                                             preview=None)
-
-      if attribute_class == 'DipAzm':
-        x = DipAzm()
-        darray, chunks_init = DipAzm.create_array(x, darray, kernel=None, 
-                                                  preview=None)
-      
-      if attribute_class == 'EdgeDetection':  
-        x = EdgeDetection()
-        darray, chunks_init = EdgeDetection.create_array(x, darray, kernel, 
-                                                         preview=None)
-
-    return(x, darray)
-
-
-  def compute(x, darray, attribute_class, attribute_type, kernel, 
-              sample_rate, dip_factor, axis):
-
-    if attribute_class == 'Amplitude':
-
-      if attribute_type == 'fder':
-        result = SignalProcess.first_derivative(x, darray, axis=-1, 
-                                                preview=None)
-        return(result)
-      
-      if attribute_type == 'sder':
-        result = SignalProcess.second_derivative(x, darray, axis=-1, 
-                                                 preview=None)
-        return(result)
-
-      if attribute_type == 'rms':
-        result = SignalProcess.rms(x, darray, kernel=(1,1,9), 
-                                   preview=None)
-        return(result)
-
-      if attribute_type == 'gradmag':
-        result = SignalProcess.gradient_magnitude(x, darray, sigmas=(1,1,1), 
-                                                  preview=None)
-        return(result)
-
-      if attribute_type == 'reflin':
-        result = SignalProcess.reflection_intensity(x, darray, kernel=(1,1,9), 
-                                                    preview=None)
-        return(result)
-
-    if attribute_class == 'CompleTrace':  
-
-      if attribute_type == 'enve':
-        result = ComplexAttributes.envelope(x, darray, preview=None)
-        return(result)
-
-      if attribute_type == 'inphase':
-        result = ComplexAttributes.instantaneous_phase(x, darray, preview=None)   
-        return(result)
-
-      if attribute_type == 'cosphase':
-        result = ComplexAttributes.cosine_instantaneous_phase(x, darray, 
-                                                              preview=None)   
-        return(result)
-
-      if attribute_type == 'ampcontrast':
-        result = ComplexAttributes.relative_amplitude_change(x, darray, 
-                                                             preview=None)
-        return(result)
-
-      if attribute_type == 'ampacc':
-        result = ComplexAttributes.amplitude_acceleration(x, darray, 
-                                                          preview=None)
-        return(result)
-
-      if attribute_type == 'infreq':
-        result = ComplexAttributes.instantaneous_frequency(x, darray, 
-                                                           sample_rate=4, 
-                                                           preview=None)
-        return(result)
-
-      if attribute_type == 'inband':
-        result = ComplexAttributes.instantaneous_bandwidth(x, darray, 
-                                                           preview=None)
-        return(result)
-
-      if attribute_type == 'domfreq':
-        result = ComplexAttributes.dominant_frequency(x, darray, sample_rate=4, 
-                                                      preview=None)
-        return(result)
-
-      if attribute_type == 'freqcontrast':
-        result = ComplexAttributes.dominant_frequency(x, darray, sample_rate=4, 
-                                                      preview=None)
-        return(result)
-
-      if attribute_type == 'sweet':
-        result = ComplexAttributes.sweetness(x, darray, sample_rate=4, 
-                                             preview=None)
-        return(result)
-
-      if attribute_type == 'quality':
-        result = ComplexAttributes.quality_factor(x, darray, sample_rate=4, 
-                                                  preview=None)
-        return(result)
-
-      if attribute_type == 'resphase':
-        result = ComplexAttributes.response_phase(x, darray, preview=None)
-        return(result)
-
-      if attribute_type == 'resfreq':
-        result = ComplexAttributes.response_frequency(x, darray, sample_rate=4, 
-                                                      preview=None)
-        return(result) 
-
-      if attribute_type == 'resamp':
-        result = ComplexAttributes.response_amplitude(x, darray, preview=None)
-        return(result)
-
-      if attribute_type == 'apolar':
-        result = ComplexAttributes.apparent_polarity(x, darray, preview=None)
-        return(result)
-
-    if attribute_class == 'DipAzm':
-
-      if attribute_type == 'dipgrad':
-        result = DipAzm.gradient_dips(x, darray, dip_factor=10, kernel=(3,3,3), 
-                                      preview=None)
-        return(result) # result is il_dip, xl_dip
-
-      if attribute_type == 'gst':
-        result = DipAzm.gradient_structure_tensor(x, darray, kernel, 
-                                                  preview=None)
-        return(result) # result is gi2, gj2, gk2, gigj, gigk, gjgk
-      
-      if attribute_type == 'gstdip2d':
-        result = DipAzm.gst_2D_dips(x, darray, dip_factor=10, kernel=(3,3,3), 
-                                    preview=None)
-        return(result) # result is il_dip, xl_dip
-
-      if attribute_type == 'gstdip3d':
-        result = DipAzm.gst_3D_dip(x, darray, dip_factor=10, kernel=(3,3,3), 
-                                   preview=None)
-        return(result)
-
-      if attribute_type == 'gstazm3d':
-        result = DipAzm.gst_3D_azm(x, darray, dip_factor=10, kernel=(3,3,3), 
-                                   preview=None)
-        return(result)
-
-
-    if attribute_class == 'EdgeDetection':  
-
-      if attribute_type == 'semblance':
-        result = EdgeDetection.semblance(x, darray, kernel=(3,3,9), 
-                                         preview=None)
-        return(result)
-
-      if attribute_type == 'gstdisc':
-        result = EdgeDetection.gradient_structure_tensor(x, darray, 
-                                                         kernel=(3,3,9), 
-                                                         preview=None)
-        return(result)
-
-      if attribute_type == 'eigen':
-        result = EdgeDetection.eig_complex(x, darray, kernel=(3,3,9), 
-                                           preview=None)
-        return(result)
-
-      if attribute_type == 'chaos':
-        result = EdgeDetection.chaos(x, darray, kernel=(3,3,9), 
-                                     preview=None)
-        return(result)
-
-      if attribute_type == 'curv':
-        # compute first inline and xline dips from gst
-        x = DipAzm()
-        darray_il, darray_xl = DipAzm.gradient_dips(x, darray, dip_factor=10, 
-                                                    kernel=(3,3,3), 
-                                                    preview=None)
-        # compute curvature
-        result = EdgeDetection.volume_curvature(x, darray_il, darray_xl, 
-                                                dip_factor=10, 
-                                                kernel=(3,3,3), 
-                                                preview=None) 
-        return(result) # result is H, K, Kmax, Kmin, KMPos, KMNeg
-  
   """
   Main Program
   """
 
+  # A list of attribute types is computed together and returned as a dict
+  multiple = isinstance(attribute_type, (list, tuple))
+  if multiple:
+    if display:
+      raise ValueError("Display one attribute at a time")
+    attribute_types = [_attribute_enum(attribute_class, t) 
+                       for t in attribute_type]
+  else:
+    attribute_type = _attribute_enum(attribute_class, attribute_type)
+
   if output == '3d':
 
     # 3D cube is directly as input to compute attribute function
 
     darray = cube.data
-    x, darray = make_dask(darray, output, attribute_class, 
-                          attribute_type, kernel)
-    result = compute(x, darray, attribute_class, attribute_type, kernel, 
-                     sample_rate, dip_factor, axis)   
+
+    if multiple:
+      if out_file is not None:
+        raise ValueError("out_file takes a single attribute type")
+      return _compute_multi(darray, output, attribute_class, attribute_types, 
+                            kernel, sample_rate, dip_factor, axis, use_dask)
+
+    operation = _ANALYTIC_DISPATCH.get(attribute_type)
+    if not use_dask and operation is not None:
+      result = _compute_analytic_3d(darray, operation)
+    else:
+      x, darray = _make_dask(darray, output, attribute_class, kernel)
+      result = _compute(x, darray, attribute_class, attribute_type, kernel, 
+                        sample_rate, dip_factor, axis)   
+
+    if out_file is not None:
+      # Stream the attribute to disk block by block with Dask's scheduler,
+      # then reopen it read-only
+      util = importlib.import_module('util')
+      util.save(result, out_file)
+      return util.read(out_file)
     
     return result
 
@@ -590,93 +1353,162 @@ def sliceAttribute(cube, output='2d', type='il',
     # processing input to attribute computation
     # then compute attribute 
 
-    # Unwrap inlines, xlines, twt
-    inline_array, xline_array, timeslice_array = cube.inlines, cube.crosslines, cube.twt
-
-    if type == 'il':
-      slices = sliceCube(cube, type, inline_loc=inline_loc)
-
-      darray = np.reshape(slices, slices.shape + (1,))
-
-      x, darray = make_dask(darray, output, attribute_class, 
-                            attribute_type, kernel)
-      result = compute(x, darray, attribute_class, attribute_type, 
-                       kernel, sample_rate, dip_factor, axis)
-      
-      if display==False:
-        # Outputs 2D attribute
-        return result.compute()
+    slice_kw, b_name, c_name = _SLICE_TYPES[type]
+    loc = {'il': inline_loc, 'xl': xline_loc, 'ts': timeslice_loc}[type]
+    b_line, c_line = cube[b_name], cube[c_name]
+
+    async_compute = async_compute and display==False
+
+    # The NumPy paths never keep a reference to their input, so the input
+    # buffer of a slice geometry is reused when stepping through slices
+    reuse_buffer = not use_dask and not async_compute and \
+                   all(t in _ANALYTIC_DISPATCH or t in _DERIVATIVE_DISPATCH 
+                       for t in (attribute_types if multiple 
+                                 else [attribute_type]))
+
+    def slice_input():
+      slices = sliceCube(cube, type, **{slice_kw: loc})
+      if not reuse_buffer:
+        return np.ascontiguousarray(slices[np.newaxis], dtype=np.float32)
+
+      buffer = _slice_buffer(type, slices.shape)
+      np.copyto(buffer[0], slices)
+      return buffer
+
+    if multiple:
+      return _compute_multi(slice_input(), output, attribute_class, 
+                            attribute_types, kernel, sample_rate, dip_factor, 
+                            axis, use_dask)
+
+    compute = lambda: _compute_2d(slice_input(), attribute_class, 
+                                  attribute_type, kernel, sample_rate, 
+                                  dip_factor, axis, use_dask, 
+                                  async_compute=async_compute)
+
+    if async_compute:
+      result = compute()
+    else:
+      key = (id(cube), type, loc, attribute_type, kernel, sample_rate, 
+             dip_factor, axis, use_dask)
+
+      if attribute_type in _DERIVED_2D:
+        # e.g. curvature reuses the dips of an earlier 'dipgrad' of this 
+        # slice, and leaves them cached for one that follows
+        source_type, derive = _DERIVED_2D[attribute_type]
+        source = lambda: _compute_2d(slice_input(), 
+                                     _ATTRIBUTE_CLASS_OF[source_type], 
+                                     source_type, kernel, sample_rate, 
+                                     dip_factor, axis, use_dask)
+        source_key = key[:3] + (source_type,) + key[4:]
+        compute = lambda: derive(_cached_slice(source_key, cube, source))
+
+      result = _cached_slice(key, cube, compute)
+
+    if display==False:
+      # Outputs 2D attribute
+      return result
+
+    if display==True:
+      # Display the attribute
+      extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
+      plotAttribute(result, extent, cmap=cmap, vmin=vmin, vmax=vmax, 
+                    figsize=figsize)
+
+def plotAttribute(result, extent, cmap='plasma', vmin=None, vmax=None, 
+                  figsize=(10,5)):
+  """
+  Display a 2D attribute slice computed by sliceAttribute(display=False) in 
+  a new figure
 
-      if display==True:
-        # Display the attribute
-        b_line, c_line = xline_array, timeslice_array
+  INPUT:
 
-        trans_attr = result.T
-        reshape = trans_attr.reshape((trans_attr.shape[0], -1))
+  result: 2D attribute output of sliceAttribute, shaped (1, traces, samples),
+          or any (traces, samples) array
 
-        extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
+  extent: [left, right, bottom, top] axis limits of the slice
 
-        plt.figure(figsize=figsize)        
-        p1 = plt.imshow(reshape.T, vmin=vmin, vmax=vmax, aspect='auto', 
-                        extent=extent, cmap=cmap)
-        plt.colorbar(p1)        
+  cmap, vmin, vmax, figsize: same as in sliceAttribute
+  """
+  plt.figure(figsize=figsize)
+  p1 = plt.imshow(_display_image(result), vmin=vmin, vmax=vmax, 
+                  aspect='auto', extent=extent, cmap=cmap, 
+                  interpolation='nearest', resample=False)
+  plt.colorbar(p1)
 
-    if type == 'xl':
-      slices = sliceCube(cube, type, xline_loc=xline_loc)      
+def _display_image(result):
+  """
+  Image of a (1, traces, samples) attribute slice, or a (traces, samples) 
+  one, for the current figure, with time down the rows. Beyond twice the 
+  pixels of the figure only every n-th trace and sample is kept, and for a 
+  lazy slice only those are computed
+  """
+  if result.ndim == 2:
+    result = result[np.newaxis]
+  if result.ndim != 3 or result.shape[0] != 1:
+    raise ValueError("Expected a 2D slice, got shape {}".format(result.shape))
+
+  width, height = plt.gcf().get_size_inches() * plt.gcf().dpi
+  n_traces, n_samples = result.shape[1:]
+  step_b = max(1, n_traces // int(2 * width))
+  step_c = max(1, n_samples // int(2 * height))
+
+  image = np.asarray(result[0, ::step_b, ::step_c]).T
+  if step_b > 1 or step_c > 1:
+    # The figure keeps its image for as long as it lives; a copy keeps it 
+    # from pinning the whole attribute slice behind a strided view
+    image = image.copy()
+
+  return image
+
+def sliceAttributeBatch(cube, locs, type='il', 
+                        attribute_class='CompleTrace', 
+                        attribute_type='cosphase', **kwargs):
+  """
+  Computing attribute of many 2D slices of a 3D seismic cube at once, e.g. 
+  every inline for a movie
 
-      darray = np.reshape(slices, slices.shape + (1,))  
+  INPUT:
 
-      x, darray = make_dask(darray, output, attribute_class, 
-                            attribute_type, kernel)
-      result = compute(x, darray, attribute_class, attribute_type, 
-                       kernel, sample_rate, dip_factor, axis)
+  cube: 3D seismic output of openSegy3D
 
-      if display==False:
-        # Outputs 2D attribute
-        return result.compute()
-        
-      if display==True:
-        # Display the attribute
-        b_line, c_line = inline_array, timeslice_array
+  locs: locations of the slices (list of inlines, crosslines or timeslices)
 
-        trans_attr = result.T
-        reshape = trans_attr.reshape((trans_attr.shape[0], -1))
+  type: specify the type of slice
+    * 'il' for inline
+    * 'xl' for crossline
+    * 'ts' for timeslice
 
-        extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
+  attribute_class, attribute_type: same as in sliceAttribute
 
-        plt.figure(figsize=figsize)        
-        p1 = plt.imshow(reshape.T, vmin=vmin, vmax=vmax, aspect='auto', 
-                        extent=extent, cmap=cmap)
-        plt.colorbar(p1)          
+  Other keyword arguments (kernel, sample_rate, ...) are passed on to 
+  sliceAttribute.
 
-    if type == 'ts':
-      slices = sliceCube(cube, type, timeslice_loc=timeslice_loc)      
+  OUTPUT:
 
-      darray = np.reshape(np.transpose(slices), 
-                          (np.transpose(slices)).shape + (1,))
+  Attribute slices stacked along the first axis, each one equal to the 
+  output of sliceAttribute for that location
+  """
+  slice_kw = _SLICE_TYPES[type][0]
 
-      x, darray = make_dask(darray, output, attribute_class, 
-                            attribute_type, kernel)
-      result = compute(x, darray, attribute_class, attribute_type, 
-                       kernel, sample_rate, dip_factor, axis)
+  attribute_type = _attribute_enum(attribute_class, attribute_type)
+  operation = _ANALYTIC_DISPATCH.get(attribute_type)
 
-      if display==False:
-        # Outputs 2D attribute
-        return result.compute()
-        
-      if display==True:
-        # Display the attribute
-        b_line, c_line = inline_array, xline_array
+  if kwargs.get('use_dask', False) or operation is None:
+    # one slice at a time through sliceAttribute
+    results = [sliceAttribute(cube, output='2d', type=type, 
+                              attribute_class=attribute_class, 
+                              attribute_type=attribute_type, 
+                              **dict(kwargs, **{slice_kw: loc})) 
+               for loc in locs]
+    return np.concatenate(results)
 
-        trans_attr = result.T
-        reshape = trans_attr.reshape((trans_attr.shape[0], -1))
+  # Stack the slices in the layout sliceAttribute uses and transform 
+  # them all with a single Hilbert call
+  slices = [sliceCube(cube, type, **{slice_kw: loc}) for loc in locs]
+  batch = np.stack(slices).astype(np.float32, copy=False)
 
-        extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
-        
-        plt.figure(figsize=figsize)
-        p1 = plt.imshow(reshape, vmin=vmin, vmax=vmax, aspect='auto', 
-                        extent=extent, cmap=cmap)
-        plt.colorbar(p1)             
+  util = importlib.import_module('util')
+  return operation(util, _analytic_trace(util, batch))
 
 def plot2D(computed_attribute, cube, type, cmap='plasma', vmin=None, vmax=None):
   """
@@ -684,7 +1516,11 @@ def plot2D(computed_attribute, cube, type, cmap='plasma', vmin=None, vmax=None):
 
   INPUT:
 
-  computed_attribute: output from computation (3D Dask array)
+  computed_attribute: output from computation, a (traces, samples) array or
+                      a (1, traces, samples) one as sliceAttribute returns 
+                      (NumPy or Dask array)
+
+  cube: 3D seismic output of openSegy3D, for the axes of the slice
   
   type: 'il' for inline, 'xl' for crossline, 'ts' for timeslice
 
@@ -697,39 +1533,13 @@ def plot2D(computed_attribute, cube, type, cmap='plasma', vmin=None, vmax=None):
   * vmin = -percentile99, vmax = +percentile99, percentiles of the cube
   """
 
-  import numpy as np
-  import matplotlib.pyplot as plt
-  
-  # Unwrap cube
-  inline_array, xline_array, twt_array = cube.inlines, cube.crosslines, cube.twt
-
-  if type == 'il':
-    b_line, c_line = xline_array, twt_array 
-    trans_attr = computed_attribute.T
-    reshape = trans_attr.reshape((trans_attr.shape[0], -1))
-
-    extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
-    p1 = plt.imshow(reshape.T, vmin=vmin, vmax=vmax, aspect='auto', extent=extent, cmap=cmap)
-    plt.colorbar(p1)
-    
-  if type == 'xl':
-    b_line, c_line = inline_array, twt_array     
-    trans_attr = computed_attribute.T
-    reshape = trans_attr.reshape((trans_attr.shape[0], -1))
-
-    extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
-    p1 = plt.imshow(reshape.T, vmin=vmin, vmax=vmax, aspect='auto', extent=extent, cmap=cmap)
-    plt.colorbar(p1)    
-
-  if type == 'ts':
-    b_line, c_line = inline_array, xline_array   
-    trans_attr = computed_attribute.T
-    reshape = trans_attr.reshape((trans_attr.shape[0], -1))
-
-    extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
-    p1 = plt.imshow(reshape, vmin=vmin, vmax=vmax, aspect='auto', extent=extent, cmap=cmap)
-    plt.colorbar(p1)            
+  slice_kw, b_name, c_name = _SLICE_TYPES[type]
+  b_line, c_line = cube[b_name], cube[c_name]
 
+  extent = [b_line[0], b_line[-1], c_line[-1], c_line[0]]
+  p1 = plt.imshow(_display_image(computed_attribute), vmin=vmin, vmax=vmax, aspect='auto', extent=extent, cmap=cmap, 
+                  interpolation='nearest', resample=False)
+  plt.colorbar(p1)
 
 def sliceFluidFactor(near_cube, far_cube, type='il', 
                      inline_loc=400, 
@@ -769,10 +1579,6 @@ def sliceFluidFactor(near_cube, far_cube, type='il',
   
   If "crossplot=True", crossplot display is produced.
   """
-  from sklearn.linear_model import LinearRegression
-  import matplotlib.pyplot as plt
-  import numpy as np
-
   # Slice cube
   if type=='il':
     sliceNear = sliceCube(near_cube, type, inline_loc=inline_loc)
@@ -784,14 +1590,17 @@ def sliceFluidFactor(near_cube, far_cube, type='il',
     sliceNear = sliceCube(near_cube, type, timeslice_loc=timeslice_loc)
     sliceFar = sliceCube(far_cube, type, timeslice_loc=timeslice_loc)
 
-  # Calculate FF
-  near_data, far_data = np.ndarray.flatten(sliceNear), np.ndarray.flatten(sliceFar)
-  diff = far_data - near_data       
+  # Calculate FF. Least squares of diff = coef * near without intercept 
+  # has the closed form coef = near.diff / near.near, in float64 sums
+  near_data = sliceNear.ravel().astype(np.float64)
+  diff = sliceFar.ravel() - near_data
 
-  lr = LinearRegression(fit_intercept=False, normalize=False, copy_X=True, n_jobs=1)
-  lr.fit(near_data.reshape(-1,1), diff.reshape(-1,1))
-  coef = lr.coef_[0]
-  R2 = lr.score(near_data.reshape(-1,1), diff.reshape(-1,1))
+  coef = np.array([np.dot(near_data, diff) / np.dot(near_data, near_data)])
+  # FF = diff - coef * near, built in one buffer without a temporary
+  residual = np.multiply(near_data, -coef[0])
+  residual += diff
+  deviation = diff - diff.mean()
+  R2 = 1 - np.dot(residual, residual) / np.dot(deviation, deviation)
 
   if crossplot==True:
     plt.figure(figsize=(7,7))
@@ -800,7 +1609,7 @@ def sliceFluidFactor(near_cube, far_cube, type='il',
     plt.scatter(near_data, diff, color='blue', alpha=0.5)  
 
     # Regressed line
-    xmin, xmax = min(near_data), max(near_data)
+    xmin, xmax = near_data.min(), near_data.max()
     x = np.linspace(xmin, xmax, 10)
     y = coef * x
     plt.plot(x, y, color='red', label="coef: {:.3f} \n $R^2$: {:.3f}".format(coef[0], R2))
@@ -812,6 +1621,7 @@ def sliceFluidFactor(near_cube, far_cube, type='il',
     plt.gca().set_aspect('equal') 
 
   if crossplot==False:
-    diff = sliceFar - sliceNear
-    FF = diff - coef[0] * sliceNear
+    # FF = (Far - Near) - coef * Near is the residual of the fit
+    dtype = np.promote_types(sliceNear.dtype, sliceFar.dtype)
+    FF = residual.reshape(sliceNear.shape).astype(dtype, copy=False)
     return FF    
@@ -1,37 +1,67 @@
+import functools
+from collections import OrderedDict
+
+import numpy as np
+
+# Wavelets by their frequencies and time samples, most recently used last.
+# Modelling convolves the same wavelet against many traces, so repeated 
+# calls return a copy instead of redoing the trigonometry
+_WAVELETS = OrderedDict()
+_WAVELETS_SIZE = 64
+
+def _memoize(wavelet):
+    @functools.wraps(wavelet)
+    def cached(f, t, *args, **kwargs):
+        t = np.asarray(t)
+        key = (wavelet.__name__, tuple(np.ravel(f).tolist()), args, 
+               tuple(sorted(kwargs.items())), t.dtype.str, t.shape, t.tobytes())
+        if key in _WAVELETS:
+            _WAVELETS.move_to_end(key)
+        else:
+            _WAVELETS[key] = wavelet(f, t, *args, **kwargs)
+            if len(_WAVELETS) > _WAVELETS_SIZE:
+                _WAVELETS.popitem(last=False)
+        return _WAVELETS[key].copy()
+    return cached
+
+@_memoize
 def Ricker(f, t):
     assert len(f) == 1, 'Ricker wavelet needs 1 frequency as input'
     # f = f[0]
-    pift = np.pi * f * t
-    wav = (1 - 2 * pift ** 2) * np.exp(-pift ** 2)
+    pift2 = (np.pi * f * t) ** 2
+    wav = np.exp(-pift2)
+    wav *= 1 - 2 * pift2
     return wav
 
+@_memoize
 def Ormsby(f, t):
     assert len(f) == 4, 'Ormsby wavelet needs 4 frequencies as input'
     f = np.sort(f)  # Ormsby wavelet frequencies must be in increasing order
     pif = np.pi * f
     den1 = pif[3] - pif[2]
     den2 = pif[1] - pif[0]
-    term1 = (pif[3] * np.sinc(pif[3] * t)) ** 2 - (pif[2] * np.sinc(pif[2])) ** 2
-    term2 = (pif[1] * np.sinc(pif[1] * t)) ** 2 - (pif[0] * np.sinc(pif[0])) ** 2
 
-    wav = term1 / den1 - term2 / den2
+    # np.sinc(x) = sin(pi x) / (pi x), so sinc(f t) needs no factor of pi.
+    # The four squared sincs are one array, summed with their weights
+    sinc2 = np.sinc(np.multiply.outer(f, t)) ** 2
+    weights = np.array([pif[0] ** 2 / den2, -pif[1] ** 2 / den2, 
+                        -pif[2] ** 2 / den1, pif[3] ** 2 / den1])
+    wav = np.tensordot(weights, sinc2, axes=1)
+    wav /= wav.max()
     return wav
-  
-def Ormsby(f, t):
-  f1, f2, f3, f4 = f
-  A = ((np.pi*f4)**2 / (np.pi*f4 - np.pi*f3)) * (np.sinc(f4*t)**2)
-  B = ((np.pi*f3)**2 / (np.pi*f4 - np.pi*f3)) * (np.sinc(f3*t)**2)
-  C = ((np.pi*f2)**2 / (np.pi*f2 - np.pi*f1)) * (np.sinc(f2*t)**2)
-  D = ((np.pi*f1)**2 / (np.pi*f2 - np.pi*f1)) * (np.sinc(f1*t)**2)
-  wav = (A-B)-(C-D)
-  wav = wav / max(wav)
-  return wav
 
+@_memoize
 def Klauder(f, t, T=5.0):
     assert len(f) == 2, 'Klauder wavelet needs 2 frequencies as input'
 
     k = np.diff(f) / T
     f0 = np.sum(f) / 2.0
-    wav = np.real(np.sin(np.pi * k * t * (T - t)) / (np.pi * k * t) * np.exp(2 * np.pi * 1j * f0 * t))
-    wav = wav / max(wav)    
+    # The sweep envelope is real, so the real part of its product with 
+    # exp(2 pi i f0 t) is its product with the cosine, no complex array needed
+    # sin(pi k t (T - t)) / (pi k t) = (T - t) sinc(k t (T - t)), which 
+    # takes its limit T at t = 0 instead of 0/0
+    wav = np.sinc(k * t * (T - t))
+    wav *= T - t
+    wav *= np.cos(2 * np.pi * f0 * t)
+    wav /= wav.max()
     return wav
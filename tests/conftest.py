@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Figures are drawn without a display
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+# The modules are used from their folders, as in the notebooks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ('seismic', os.path.join('seismic', 'attributes')):
+  path = os.path.join(ROOT, folder)
+  if path not in sys.path:
+    sys.path.append(path)
@@ -0,0 +1,100 @@
+import importlib.util
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+segyio = pytest.importorskip('segyio')
+
+# attributes/io.py shares its name with the standard library module
+PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    'seismic', 'attributes', 'io.py')
+spec = importlib.util.spec_from_file_location('seismic_io', PATH)
+seismic_io = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(seismic_io)
+
+def make_segy(path, ilines, xlines, samples=25, ext_headers=0, order=None):
+  spec = segyio.spec()
+  spec.ilines, spec.xlines = ilines, xlines
+  spec.samples = range(samples)
+  spec.format, spec.sorting = 5, 2
+  spec.ext_headers = ext_headers
+
+  data = np.random.default_rng(0).random(
+    (len(ilines) * len(xlines), samples), dtype=np.float32)
+  positions = [(il, xl) for il in ilines for xl in xlines]
+  order = range(len(positions)) if order is None else order
+  with segyio.create(str(path), spec) as f:
+    for i, trace in enumerate(order):
+      il, xl = positions[trace]
+      f.header[i] = {segyio.TraceField.INLINE_3D: il,
+                     segyio.TraceField.CROSSLINE_3D: xl}
+      f.trace[i] = data[trace]
+    f.bin.update(exth=ext_headers, hns=samples, hdt=4000)
+  return data
+
+def expected_lines(segy_file):
+  return (segy_file.attributes(segyio.TraceField.INLINE_3D)[:],
+          segy_file.attributes(segyio.TraceField.CROSSLINE_3D)[:])
+
+@pytest.mark.parametrize('ext_headers', [0, 2])
+def test_trace_lines_from_headers(tmp_path, ext_headers):
+  path = tmp_path / 'cube.sgy'
+  make_segy(path, [11, 12, 13], [205, 206, 207, 208], ext_headers=ext_headers)
+
+  with segyio.open(str(path), ignore_geometry=True) as f:
+    assert f.ext_headers == ext_headers
+    inlines, xlines = seismic_io._trace_lines(f, str(path))
+    expected_il, expected_xl = expected_lines(f)
+
+  np.testing.assert_array_equal(inlines, expected_il)
+  np.testing.assert_array_equal(xlines, expected_xl)
+
+def test_trace_lines_falls_back_to_segyio(tmp_path):
+  path = tmp_path / 'cube.sgy'
+  make_segy(path, [11, 12, 13], [205, 206, 207, 208])
+  # segyio refuses to open a file whose traces do not fill it evenly, so
+  # the layout is measured from a copy with a few trailing bytes instead
+  padded = tmp_path / 'padded.sgy'
+  shutil.copy(str(path), str(padded))
+  with open(str(padded), 'ab') as f:
+    f.write(b'\0' * 3)
+
+  with segyio.open(str(path), ignore_geometry=True) as f:
+    inlines, xlines = seismic_io._trace_lines(f, str(padded))
+    expected_il, expected_xl = expected_lines(f)
+
+  np.testing.assert_array_equal(inlines, expected_il)
+  np.testing.assert_array_equal(xlines, expected_xl)
+
+def per_trace_cube(path):
+  with segyio.open(str(path), ignore_geometry=True) as f:
+    inlines, xlines = expected_lines(f)
+    cube = np.zeros((np.unique(inlines).size, np.unique(xlines).size,
+                     len(f.samples)), dtype=np.float32)
+    for i, (il, xl) in enumerate(zip(inlines, xlines)):
+      cube[il - inlines.min(), xl - xlines.min()] = f.trace.raw[i]
+  return cube
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_segy_read_splits_inlines_across_chunks(tmp_path, monkeypatch, shuffle):
+  h5py = pytest.importorskip('h5py')
+  order = np.random.default_rng(1).permutation(54) if shuffle else None
+  path = tmp_path / 'cube.sgy'
+  make_segy(path, list(range(1, 7)), list(range(21, 30)), order=order)
+  monkeypatch.setattr(seismic_io, '_TRACE_CHUNK', 7)
+
+  seismic_io.segy_read(str(path), str(tmp_path / 'cube.hdf5'), 'seismic')
+
+  with h5py.File(str(tmp_path / 'cube.hdf5'), 'r') as f:
+    np.testing.assert_array_equal(f['seismic'][()], per_trace_cube(path))
+
+def test_segy_read_rejects_repeated_traces(tmp_path):
+  path = tmp_path / 'cube.sgy'
+  make_segy(path, [1, 2], [21, 22, 23])
+  with segyio.open(str(path), 'r+', ignore_geometry=True) as f:
+    f.header[4] = {segyio.TraceField.CROSSLINE_3D: 21}
+
+  with pytest.raises(ValueError, match='inline 2, crossline 21'):
+    seismic_io.segy_read(str(path), str(tmp_path / 'cube.hdf5'), 'seismic')
@@ -0,0 +1,232 @@
+import numpy as np
+import pytest
+
+import seistool
+
+# Attributes with a NumPy path for 2D slices
+NUMPY_2D = [('Amplitude', 'fder'), ('Amplitude', 'sder'), 
+            ('CompleTrace', 'enve'), ('CompleTrace', 'inphase'), 
+            ('CompleTrace', 'cosphase')]
+
+@pytest.fixture
+def cube():
+  data = np.random.default_rng(0).standard_normal((12, 40, 201))
+  return seistool.AttrDict(data=data.astype(np.float32), 
+                           inlines=np.arange(100, 112), 
+                           crosslines=np.arange(300, 340), 
+                           twt=np.arange(201) * 4.0)
+
+def slice_attribute(cube, type, attribute_class, attribute_type, **kwargs):
+  return seistool.sliceAttribute(cube, output='2d', type=type, 
+                                 inline_loc=103, xline_loc=310, 
+                                 timeslice_loc=80, 
+                                 attribute_class=attribute_class, 
+                                 attribute_type=attribute_type, **kwargs)
+
+@pytest.mark.parametrize('type', ['il', 'xl', 'ts'])
+@pytest.mark.parametrize('attribute_class, attribute_type', NUMPY_2D)
+def test_numpy_and_dask_2d_agree(cube, type, attribute_class, attribute_type):
+  numpy_result = slice_attribute(cube, type, attribute_class, attribute_type)
+  dask_result = slice_attribute(cube, type, attribute_class, attribute_type, 
+                                use_dask=True)
+
+  section = seistool.sliceCube(cube, type, inline_loc=103, xline_loc=310, 
+                               timeslice_loc=80)
+  assert numpy_result.shape == dask_result.shape == (1,) + section.shape
+  np.testing.assert_allclose(numpy_result, dask_result, rtol=1e-4, atol=1e-4)
+
+@pytest.mark.parametrize('attribute_type', ['enve', 'inphase', 'cosphase'])
+def test_numpy_and_dask_3d_agree(cube, attribute_type):
+  kwargs = dict(output='3d', attribute_class='CompleTrace', 
+                attribute_type=attribute_type)
+  fused = np.asarray(seistool.sliceAttribute(cube, **kwargs))
+  dask_result = np.asarray(seistool.sliceAttribute(cube, use_dask=True, 
+                                                   **kwargs))
+
+  assert fused.shape == dask_result.shape == cube.data.shape
+  np.testing.assert_allclose(fused, dask_result, rtol=1e-4, atol=1e-4)
+
+@pytest.mark.parametrize('attribute_class, attribute_type', 
+                         NUMPY_2D + [('DipAzm', 'dipgrad')])
+def test_async_matches_sync(cube, attribute_class, attribute_type):
+  import dask
+
+  sync = slice_attribute(cube, 'il', attribute_class, attribute_type)
+  lazy = slice_attribute(cube, 'il', attribute_class, attribute_type, 
+                         async_compute=True)
+
+  sync = sync if isinstance(sync, tuple) else (sync,)
+  lazy = lazy if isinstance(lazy, tuple) else (lazy,)
+  for expected, result in zip(sync, dask.compute(*lazy)):
+    assert result.shape == expected.shape == (1, 40, 201)
+    np.testing.assert_allclose(result, expected, rtol=1e-4, atol=1e-4)
+
+@pytest.mark.parametrize('type', ['il', 'xl', 'ts'])
+def test_frequency_change_2d_shape(cube, type):
+  result = slice_attribute(cube, type, 'CompleTrace', 'freqcontrast')
+
+  section = seistool.sliceCube(cube, type, inline_loc=103, xline_loc=310, 
+                               timeslice_loc=80)
+  assert result.shape == (1,) + section.shape
+
+def test_frequency_change_3d_shape(cube):
+  result = seistool.sliceAttribute(cube, output='3d', 
+                                   attribute_class='CompleTrace', 
+                                   attribute_type='freqcontrast')
+
+  assert result.shape == cube.data.shape
+  assert np.asarray(result).shape == cube.data.shape
+
+@pytest.mark.parametrize('use_dask', [False, True])
+@pytest.mark.parametrize('attribute_class, attribute_types', [
+  ('Amplitude', ['fder', 'sder', 'rms', 'reflin', 'gradmag']), 
+  ('CompleTrace', ['enve', 'cosphase', 'infreq', 'freqcontrast']), 
+  ('EdgeDetection', ['semblance', 'eigen', 'chaos'])])
+def test_multiple_types_share_shape(cube, attribute_class, attribute_types, 
+                                    use_dask):
+  results = slice_attribute(cube, 'il', attribute_class, attribute_types, 
+                            use_dask=use_dask)
+
+  assert list(results) == attribute_types
+  for result in results.values():
+    assert result.shape == (1, 40, 201)
+
+def test_multiple_types_3d_share_shape(cube):
+  results = seistool.sliceAttribute(cube, output='3d', 
+                                    attribute_class='CompleTrace', 
+                                    attribute_type=['enve', 'infreq'], 
+                                    use_dask=True)
+
+  for result in results.values():
+    assert np.asarray(result).shape == cube.data.shape
+
+def test_rms_window(cube):
+  from scipy import ndimage
+
+  result = seistool.sliceAttribute(cube, output='3d', 
+                                   attribute_class='Amplitude', 
+                                   attribute_type='rms')
+
+  squares = cube.data.astype(np.float64) ** 2
+  expected = np.sqrt(ndimage.uniform_filter(squares, (1,1,9), mode='reflect'))
+  np.testing.assert_allclose(np.asarray(result), expected, rtol=1e-4)
+
+def test_timeslice_copies_only_in_memory_cubes(cube, tmp_path):
+  mapped = np.memmap(tmp_path / 'cube', dtype=np.float32, mode='w+', 
+                     shape=cube.data.shape)
+  mapped[:] = cube.data
+
+  np.testing.assert_array_equal(seistool._timeslice(mapped, 7), 
+                                cube.data[:,:,7])
+  assert id(mapped) not in seistool._TIME_MAJOR
+
+  np.testing.assert_array_equal(seistool._timeslice(cube.data, 7), 
+                                cube.data[:,:,7])
+  assert id(cube.data) in seistool._TIME_MAJOR
+
+@pytest.mark.parametrize('shape', [(1, 40, 201), (40, 201)])
+def test_display_image_takes_2d_and_3d(shape):
+  import matplotlib.pyplot as plt
+
+  result = np.arange(np.prod(shape), dtype=np.float32).reshape(shape)
+  plt.figure()
+  image = seistool._display_image(result)
+  plt.close()
+
+  assert image.shape == (201, 40)
+  np.testing.assert_array_equal(image, result.reshape(40, 201).T)
+
+def test_display_image_rejects_cubes():
+  with pytest.raises(ValueError):
+    seistool._display_image(np.zeros((2, 40, 201)))
+
+@pytest.mark.parametrize('lazy', [False, True])
+@pytest.mark.parametrize('shape', [(1, 40, 201), (40, 201)])
+def test_plot2D_takes_2d_and_3d(cube, shape, lazy):
+  import dask.array as da
+  import matplotlib.pyplot as plt
+
+  result = np.ones(shape, dtype=np.float32)
+  if lazy:
+    result = da.from_array(result)
+
+  plt.figure()
+  seistool.plot2D(result, cube, 'il')
+  image = plt.gca().get_images()[0]
+  plt.close()
+
+  assert image.get_array().shape == (201, 40)
+  assert image.get_extent() == [300, 339, 800, 0]
+
+@pytest.fixture
+def segy_file(cube, tmp_path):
+  segyio = pytest.importorskip('segyio')
+  path = str(tmp_path / 'cube.sgy')
+  segyio.tools.from_array3D(path, cube.data)
+  return path
+
+def test_hdf5_copy_only_when_memmap(cube, segy_file):
+  seistool.convertToHDF5(segy_file)
+
+  with seistool.openSegy3D(segy_file, rotation=False).data as mapped:
+    assert isinstance(mapped, seistool._TransposedCube)
+    np.testing.assert_array_equal(mapped[3], cube.data[3])
+    np.testing.assert_array_equal(mapped[:,:,5], cube.data[:,:,5])
+    h5 = mapped.ilines.file
+  assert not h5.id.valid
+
+  data = seistool.openSegy3D(segy_file, memmap=False, rotation=False).data
+  assert type(data) is np.ndarray
+  np.testing.assert_array_equal(data, cube.data)
+
+def test_hdf5_copy_closed_when_released(segy_file):
+  import gc
+
+  seistool.convertToHDF5(segy_file)
+  data = seistool.openSegy3D(segy_file, rotation=False).data
+  h5 = data.ilines.file
+
+  del data
+  gc.collect()
+  assert not h5.id.valid
+
+def viewer_threads():
+  import threading
+  return [t for t in threading.enumerate() 
+          if t.name.startswith('sliceViewer')]
+
+def test_viewers_share_read_ahead_threads(cube):
+  pytest.importorskip('ipywidgets')
+  cube.sample_rate = 4.0
+
+  for _ in range(3):
+    seistool.sliceViewer(cube, use_gpu=False)
+  seistool._VIEWER_POOL.submit(lambda: None).result()
+
+  assert 1 <= len(viewer_threads()) <= 2
+
+def test_viewer_skips_read_ahead_beyond_budget(cube, monkeypatch):
+  pytest.importorskip('ipywidgets')
+  cube.sample_rate = 4.0
+  monkeypatch.setattr(seistool, '_VIEWER_SLICES_BYTES', 
+                      2 * 40 * 201 * 4)
+  monkeypatch.setattr(seistool, '_VIEWER_POOL', None)
+
+  seistool.sliceViewer(cube, use_gpu=False)
+
+  assert seistool._VIEWER_POOL is None
+
+def test_out_file_returns_closable_dataset(cube, tmp_path):
+  path = str(tmp_path / 'enve.h5')
+  result = seistool.sliceAttribute(cube, output='3d', 
+                                   attribute_class='CompleTrace', 
+                                   attribute_type='enve', out_file=path)
+  expected = np.asarray(seistool.sliceAttribute(cube, output='3d', 
+                                                attribute_class='CompleTrace', 
+                                                attribute_type='enve'))
+
+  np.testing.assert_allclose(result[()], expected, rtol=1e-5)
+  assert result.file.mode == 'r'
+
+  result.file.close()
+  assert not result.id.valid
@@ -0,0 +1,151 @@
+import collections
+
+import numpy as np
+import pytest
+
+import util
+
+Memory = collections.namedtuple('Memory', 'available')
+
+# Available memory and cpus, so chunk sizes do not depend on the machine
+MACHINES = [(4 * 2**30, 16), (64 * 2**30, 4), (128 * 2**30, 8)]
+
+@pytest.fixture(params=MACHINES)
+def machine(request, monkeypatch):
+  mem, cpus = request.param
+  monkeypatch.setattr(util.psutil, 'virtual_memory', lambda: Memory(mem))
+  monkeypatch.setattr(util.psutil, 'cpu_count', lambda: cpus)
+  return request.param
+
+def baseline_chunk_size(machine, shape, byte_size, kernel=(1,1,1)):
+  """
+  compute_chunk_size without preview, as written before the int32 sweep
+  """
+  ki, kj, kk = kernel
+  i_s = np.arange(ki, shape[0], dtype=np.int64)
+  j_s = np.arange(kj, shape[1], dtype=np.int64)
+  kki = i_s[(shape[0] % i_s >= ki) | (shape[0] % i_s == 0)]
+  kkj = j_s[(shape[1] % j_s >= kj) | (shape[1] % j_s == 0)]
+
+  mem, cpus = machine
+  M = ((mem / (cpus * byte_size)) / (ki * kj * kk)) * 0.75
+  Mij = kki * kkj.reshape(-1,1) * shape[2]
+  Mij[Mij > M] = -1
+  Mij = Mij.diagonal()
+
+  return (kki[Mij.argmax()], kkj[Mij.argmax()], shape[2])
+
+@pytest.mark.parametrize('N, k', [(100, 1), (1001, 3), (2000, 5)])
+def test_valid_chunks(N, k):
+  sizes = np.arange(k, N)
+  expected = sizes[(N % sizes == 0) | (N % sizes >= k)]
+
+  result = util._valid_chunks(N, k)
+
+  assert result.dtype == np.int64
+  np.testing.assert_array_equal(result, expected)
+
+# Cubes whose chunk volume products overflow int32
+@pytest.mark.parametrize('shape, kernel', [((2000, 2000, 2000), None), 
+                                           ((3000, 3000, 1500), None), 
+                                           ((3000, 3000, 1500), (3,3,9))])
+def test_chunk_size_large_cube(machine, shape, kernel):
+  chunks = util.compute_chunk_size(shape, 4, kernel=kernel)
+
+  mem, cpus = machine
+  assert chunks == baseline_chunk_size(machine, shape, 4, kernel or (1,1,1))
+  assert np.prod(chunks, dtype=np.int64) * 4 <= mem / cpus
+
+@pytest.mark.parametrize('shape', [(301,), (4, 1501), (2, 3, 1000)])
+def test_hilbert_matches_scipy(shape):
+  from scipy import signal
+
+  data = np.random.default_rng(0).standard_normal(shape)
+
+  np.testing.assert_allclose(util.hilbert(data), signal.hilbert(data), 
+                             rtol=1e-10, atol=1e-10)
+
+def test_hilbert_fast_keeps_length():
+  data = np.random.default_rng(0).standard_normal((4, 1501))
+
+  result = util.hilbert(data, fast=True)
+
+  assert result.shape == data.shape
+  np.testing.assert_allclose(result.real, data, atol=1e-10)
+
+def test_wisdom_round_trip(tmp_path, monkeypatch):
+  pytest.importorskip('pyfftw')
+  monkeypatch.setenv(util.WISDOM_ENV, str(tmp_path / 'wisdom'))
+  util.hilbert(np.ones((2, 777)))
+
+  util.save_wisdom()
+
+  assert (tmp_path / 'wisdom').read_bytes().startswith(b'(fftw-')
+  assert util.load_wisdom()
+
+def test_wisdom_needs_a_file(tmp_path, monkeypatch):
+  pytest.importorskip('pyfftw')
+  monkeypatch.delenv(util.WISDOM_ENV, raising=False)
+
+  with pytest.raises(ValueError):
+    util.save_wisdom()
+  assert not util.load_wisdom(str(tmp_path / 'missing'))
+
+@pytest.mark.parametrize('save', ['save', 'save_pipelined'])
+def test_save_reads_back_one_inline(tmp_path, monkeypatch, save):
+  h5py = pytest.importorskip('h5py')
+  monkeypatch.setattr(util, '_HDF5_CHUNK_BYTES', 4 * 50 * 30)
+  data = np.random.default_rng(0).random((9, 100, 60), dtype=np.float32)
+  darray = util.da.from_array(data, chunks=(4, 70, 60))
+
+  getattr(util, save)(darray, str(tmp_path / 'out.hdf5'))
+
+  with h5py.File(str(tmp_path / 'out.hdf5'), 'r') as f:
+    dset = f['data']
+    assert dset.chunks[0] == 1
+    assert np.prod(dset.chunks) * 4 <= util._HDF5_CHUNK_BYTES
+    np.testing.assert_array_equal(dset[5], data[5])
+    np.testing.assert_array_equal(dset[()], data)
+
+def test_hdf5_layout_aligns_blocks():
+  darray = util.da.zeros((9, 2000, 1500), chunks=(4, 650, 1500), dtype=np.float32)
+
+  aligned, chunks = util._hdf5_layout(darray)
+
+  assert chunks[0] == 1 and chunks[2] == 1500
+  assert np.prod(chunks) * 4 <= util._HDF5_CHUNK_BYTES
+  for axis, size in enumerate(chunks):
+    edges = np.cumsum(aligned.chunks[axis])[:-1]
+    assert not np.any(edges % size)
+
+def test_convert_int8_maps_range_ends():
+  data = util.da.from_array(np.array([-2.0, 0.5, 3.0]), chunks=3)
+
+  result = util.convert_dtype(data, -2.0, 3.0, np.int8).compute()
+
+  assert result.dtype == np.int8
+  np.testing.assert_array_equal(result, [-128, 0, 127])
+
+def test_convert_int8_clips_out_of_range():
+  data = util.da.from_array(np.array([-10.0, 0.5, 10.0]), chunks=3)
+
+  result = util.convert_dtype(data, -2.0, 3.0, np.int8).compute()
+
+  np.testing.assert_array_equal(result, [-128, 0, 127])
+
+def test_convert_int8_without_clip_keeps_in_range_values():
+  data = util.da.from_array(np.array([-2.0, 0.5, 3.0]), chunks=3)
+
+  result = util.convert_dtype(data, -2.0, 3.0, np.int8, clip=False).compute()
+
+  np.testing.assert_array_equal(result, [-128, 0, 127])
+
+@pytest.mark.parametrize('clip, expected', [(True, [-2, 0.5, 3]),
+                                            (False, [-10, 0.5, 10])])
+def test_convert_float16_clip(clip, expected):
+  data = util.da.from_array(np.array([-10.0, 0.5, 10.0]), chunks=3)
+
+  result = util.convert_dtype(data, -2.0, 3.0, np.float16, clip=clip).compute()
+
+  assert result.dtype == np.float16
+  np.testing.assert_array_equal(result, expected)